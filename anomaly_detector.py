@@ -1,6 +1,14 @@
+from collections import deque
+
+from sklearn.base import clone
 from sklearn.ensemble import IsolationForest
+import joblib
 import numpy as np
 
+from features import as_samples, as_series
+from flat_forest import FlatIsolationForest
+from instrumentation import timed
+
 
 class IsolationForestAnomalyDetector:
     """
@@ -25,32 +33,70 @@ class IsolationForestAnomalyDetector:
         # Initialize the Isolation Forest model
         self.model = IsolationForest(contamination=contamination, n_estimators=n_estimators)
 
+    @timed('fit')
     def fit(self, data_stream):
         """
         Fits the Isolation Forest model to the provided data stream.
 
-        :param data_stream: Array-like object representing the data stream.
+        :param data_stream: Array-like object representing the data stream, either one value per point or one row of
+                            features per point (e.g. residual lag features).
         :raises ValueError: If the input data stream is empty.
         """
         if len(data_stream) == 0:
             raise ValueError("The data stream is empty.")
 
-        # Fit the Isolation Forest model to the reshaped data stream
-        self.model.fit(data_stream.reshape(-1, 1))
+        # Fit the Isolation Forest model to the data stream, as a matrix of samples
+        self.model.fit(as_samples(data_stream))
 
-    def predict(self, data_stream):
+    def _samples(self, data_stream):
+        """
+        Returns the data stream as a matrix of samples for the fitted model; a one-dimensional array is a single
+        sample when the model has several features.
+
+        :param data_stream: Array-like object representing the data stream.
+        :return: A two-dimensional NumPy array.
+        """
+        return as_samples(data_stream, getattr(self.model, 'n_features_in_', None))
+
+    def score_samples(self, data_stream):
+        """
+        Computes the raw Isolation Forest score of each point, independent of the contamination.
+
+        :param data_stream: Array-like object representing the data stream.
+        :return: A NumPy array of scores in [-1, 0]; the lower, the more abnormal.
+        """
+        return self.model.score_samples(self._samples(data_stream))
+
+    def decision_function(self, data_stream):
+        """
+        Computes the decision value of each point, i.e. its score minus the threshold fixed by the contamination.
+
+        :param data_stream: Array-like object representing the data stream.
+        :return: A NumPy array of decision values; negative values indicate anomalies.
+        """
+        return self.model.decision_function(self._samples(data_stream))
+
+    @timed('predict')
+    def predict(self, data_stream, threshold=None):
         """
         Predicts anomalies in the provided data stream using the fitted Isolation Forest model.
 
         :param data_stream: Array-like object representing the data stream.
+        :param threshold: Optional score threshold overriding the contamination, e.g. from a
+                          StreamingQuantileThreshold; points scoring below it are anomalies (default is None).
         :return: A NumPy array of indices where anomalies were detected.
         """
+        if threshold is not None:
+            # Retune the sensitivity on the raw scores, without refitting the forest
+            return np.where(self.score_samples(data_stream) < threshold)[0]
+
         # Get predictions from the Isolation Forest model (-1 indicates an anomaly)
-        predictions = self.model.predict(data_stream.reshape(-1, 1))
+        predictions = self.model.predict(self._samples(data_stream))
         # Return the indices where anomalies were detected
         anomalies = np.where(predictions == -1)[0]
         return anomalies
 
+    @timed('retrain')
     def update_model(self, data_stream):
         """
         Updates the Isolation Forest model with new data.
@@ -61,4 +107,263 @@ class IsolationForestAnomalyDetector:
         :param data_stream: Array-like object representing the new data stream.
         """
         # Refit the Isolation Forest model with the new data stream
-        self.model.fit(data_stream.reshape(-1, 1))
+        self.model.fit(as_samples(data_stream))
+
+    def predict_segments(self, data_stream, boundaries):
+        """
+        Predicts anomalies segment by segment, retraining the model only at the given boundaries.
+
+        The first segment is scored with the current model. At every boundary (typically a debounced drift point),
+        a copy of the model is refitted on the post-drift segment alone and used to score that segment, so each point
+        is scored by the model that is valid for it. The detector itself is left unchanged, so it can be shared, e.g.
+        by a ModelCache.
+
+        :param data_stream: Array-like object representing the data stream.
+        :param boundaries: Sorted array of indices where the stream is segmented.
+        :return: A NumPy array of indices where anomalies were detected.
+        """
+        edges = np.concatenate(([0], boundaries, [len(data_stream)])).astype(int)
+
+        anomalies = [self.predict(data_stream[edges[0]:edges[1]])]
+
+        # Refit an unfitted copy with the same parameters, never the model of this detector
+        retrained = IsolationForestAnomalyDetector(contamination=self.model.contamination,
+                                                   n_estimators=self.model.n_estimators)
+        retrained.model = clone(self.model)
+        for start, end in zip(edges[1:-1], edges[2:]):
+            segment = data_stream[start:end]
+            retrained.update_model(segment)
+            anomalies.append(retrained.predict(segment) + start)
+        return np.concatenate(anomalies)
+
+    def export_flat(self):
+        """
+        Exports the fitted model into an array-backed forest for low-latency scoring of small batches.
+
+        :return: A FlatIsolationForest returning the same scores and anomalies as this detector.
+        """
+        return FlatIsolationForest.from_sklearn(self.model)
+
+    def save(self, path, compress=3):
+        """
+        Saves the fitted model to disk in a compressed joblib file.
+
+        :param path: Destination file path.
+        :param compress: The joblib compression level, from 0 (none) to 9 (default is 3).
+        """
+        joblib.dump(self.model, path, compress=compress)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a detector previously stored with save, ready to predict without refitting.
+
+        :param path: Path of the saved model file.
+        :return: An IsolationForestAnomalyDetector wrapping the loaded model.
+        """
+        model = joblib.load(path)
+        detector = cls(contamination=model.contamination, n_estimators=model.n_estimators)
+        detector.model = model
+        return detector
+
+
+class StreamingIsolationForestAnomalyDetector:
+    """
+    A streaming variant of the Isolation Forest detector with bounded memory.
+
+    Incoming chunks are written into a fixed-size ring buffer, so only the most recent ``buffer_size`` points are
+    ever kept. The forest is stored as a queue of small Isolation Forests ("tree blocks"); every update trains a
+    single new block on the buffer and evicts the oldest ones, so per-update latency and memory stay flat no matter
+    how long the stream runs.
+    """
+
+    def __init__(self, contamination=0.05, n_estimators=100, buffer_size=2048, trees_per_update=10,
+                 random_state=None):
+        """
+        Initializes the streaming detector.
+
+        :param contamination: The proportion of outliers in the data. Must be a value between 0 and 0.5.
+        :param n_estimators: The total number of trees kept in the forest (default is 100).
+        :param buffer_size: The number of most recent points kept in the ring buffer (default is 2048).
+        :param trees_per_update: The number of oldest trees replaced on each call to partial_fit (default is 10).
+        :param random_state: Seed or RandomState used to draw the seeds of the tree blocks (default is None).
+        :raises ValueError: If any of the parameters is outside its valid range.
+        """
+        if not 0 < contamination <= 0.5:
+            raise ValueError("Contamination must be between 0 and 0.5.")
+        if buffer_size <= 0:
+            raise ValueError("The buffer size must be positive.")
+        if not 0 < trees_per_update <= n_estimators:
+            raise ValueError("trees_per_update must be between 1 and n_estimators.")
+
+        self.contamination = contamination
+        self.n_estimators = n_estimators
+        self.trees_per_update = trees_per_update
+        self.random_state = np.random.RandomState(random_state)
+
+        # Preallocated ring buffer holding the most recent points of the stream (one row per point for
+        # multivariate streams, allocated on the first chunk)
+        self.buffer = np.empty(buffer_size)
+        self._write_pos = 0
+        self._count = 0
+
+        # Queue of (IsolationForest, number of trees), oldest block first
+        self.blocks = deque()
+        self.offset_ = None
+
+    @property
+    def n_trees(self):
+        """
+        The number of trees currently in the forest.
+        """
+        return sum(n for _, n in self.blocks)
+
+    @property
+    def _n_features(self):
+        """
+        The number of features of the buffered points, or None while it is not known or for a single metric.
+        """
+        return self.buffer.shape[1] if self.buffer.ndim > 1 else None
+
+    def _push(self, chunk):
+        """
+        Writes a chunk into the ring buffer, overwriting the oldest points once the buffer is full.
+
+        :param chunk: NumPy array of new points, one value or one row of features each.
+        """
+        size = len(self.buffer)
+        if len(chunk) >= size:
+            # Only the tail of an oversized chunk can fit in the buffer
+            self.buffer[:] = chunk[-size:]
+            self._write_pos = 0
+            self._count = size
+            return
+
+        end = self._write_pos + len(chunk)
+        if end <= size:
+            self.buffer[self._write_pos:end] = chunk
+        else:
+            split = size - self._write_pos
+            self.buffer[self._write_pos:] = chunk[:split]
+            self.buffer[:end - size] = chunk[split:]
+        self._write_pos = end % size
+        self._count = min(self._count + len(chunk), size)
+
+    def _fit_block(self, n_trees):
+        """
+        Trains a new tree block on the current buffer contents and appends it to the forest.
+
+        :param n_trees: The number of trees in the new block.
+        """
+        # The order of points does not matter for training, so the buffer is used without unrolling it
+        window = as_samples(self.buffer[:self._count])
+        block = IsolationForest(n_estimators=n_trees, contamination='auto',
+                                random_state=self.random_state.randint(np.iinfo(np.int32).max))
+        block.fit(window)
+        self.blocks.append((block, n_trees))
+
+    def _score_samples(self, data_stream):
+        """
+        Computes the Isolation Forest score of each point, combining all tree blocks.
+
+        Each block's score is converted back to its normalized path length, which is averaged over all trees and
+        mapped to a score again, so the blocks behave like a single forest built from all their trees.
+
+        :param data_stream: NumPy array of points, with the same features as the buffer.
+        :return: A NumPy array of scores (the lower, the more abnormal).
+        """
+        X = as_samples(data_stream)
+        path_lengths = np.zeros(len(data_stream))
+        for block, n_trees in self.blocks:
+            path_lengths -= n_trees * np.log2(-block.score_samples(X))
+        return -np.power(2.0, -path_lengths / self.n_trees)
+
+    @timed('partial_fit')
+    def partial_fit(self, chunk):
+        """
+        Adds a chunk of the stream to the ring buffer and incrementally retrains the forest.
+
+        The first call builds the full forest. Later calls drop the oldest tree blocks and train at least
+        ``trees_per_update`` new trees on the buffer, as many as needed to keep ``n_estimators`` trees, then recompute
+        the decision threshold on the buffer.
+
+        :param chunk: Array-like object representing the new points of the data stream, either one value per point
+                      or one row of features per point.
+        :raises ValueError: If the chunk is empty or its features differ from those already in the buffer.
+        """
+        chunk = as_series(np.asarray(chunk, dtype=float), self._n_features)
+        if len(chunk) == 0:
+            raise ValueError("The data stream is empty.")
+
+        if chunk.shape[1:] != self.buffer.shape[1:]:
+            if self._count:
+                raise ValueError("The chunk does not have the same number of features as the buffer.")
+            # The buffer takes the feature layout of the first chunk
+            self.buffer = np.empty((len(self.buffer),) + chunk.shape[1:])
+
+        self._push(chunk)
+
+        if not self.blocks:
+            # Build the initial forest out of full-size blocks
+            remaining = self.n_estimators
+            while remaining > 0:
+                n_trees = min(self.trees_per_update, remaining)
+                self._fit_block(n_trees)
+                remaining -= n_trees
+        else:
+            # Swap out only the oldest trees of the forest; blocks are evicted whole, so the new block fills the gap
+            # to keep exactly n_estimators trees when n_estimators is not a multiple of trees_per_update
+            while self.blocks and self.n_trees + self.trees_per_update > self.n_estimators:
+                self.blocks.popleft()
+            self._fit_block(self.n_estimators - self.n_trees)
+
+        # Define the threshold with respect to the contamination on the current window
+        window_scores = self._score_samples(self.buffer[:self._count])
+        self.offset_ = np.percentile(window_scores, 100.0 * self.contamination)
+
+    @timed('score')
+    def score_chunk(self, chunk):
+        """
+        Scores a chunk of the stream with the current forest.
+
+        :param chunk: Array-like object representing points of the data stream.
+        :return: A NumPy array of decision values; negative values indicate anomalies.
+        :raises ValueError: If the model has not been fitted yet.
+        """
+        if not self.blocks:
+            raise ValueError("The model has not been fitted yet.")
+
+        chunk = as_series(np.asarray(chunk, dtype=float), self._n_features)
+        if chunk.shape[1:] != self.buffer.shape[1:]:
+            raise ValueError("The chunk does not have the same number of features as the buffer.")
+        return self._score_samples(chunk) - self.offset_
+
+    def fit(self, data_stream):
+        """
+        Resets the detector and fits it to the provided data stream.
+
+        :param data_stream: Array-like object representing the data stream.
+        :raises ValueError: If the input data stream is empty.
+        """
+        self.blocks.clear()
+        self.buffer = np.empty(len(self.buffer))
+        self._write_pos = 0
+        self._count = 0
+        self.partial_fit(data_stream)
+
+    def predict(self, data_stream):
+        """
+        Predicts anomalies in the provided data stream using the current forest.
+
+        :param data_stream: Array-like object representing the data stream.
+        :return: A NumPy array of indices where anomalies were detected.
+        """
+        return np.where(self.score_chunk(data_stream) < 0)[0]
+
+    def update_model(self, data_stream):
+        """
+        Updates the model with new data by replacing the oldest trees of the forest.
+
+        :param data_stream: Array-like object representing the new data stream.
+        """
+        self.partial_fit(data_stream)
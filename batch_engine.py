@@ -0,0 +1,125 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+import os
+
+import numpy as np
+
+from anomaly_detector import IsolationForestAnomalyDetector
+from data_scaler import scale_data
+from drift_detector import detect_simple_drift
+from features import as_series
+
+
+def process_series(series, contamination=0.05, n_estimators=100, window_size=50, drift_threshold=0.2):
+    """
+    Runs the full detection pipeline on a single series: scaling, Isolation Forest and drift detection.
+
+    :param series: NumPy array representing the data stream values, one value or one row of features per point.
+    :param contamination: The proportion of outliers in the data (default is 0.05).
+    :param n_estimators: The number of trees in the forest (default is 100).
+    :param window_size: The window size of the drift detector (default is 50).
+    :param drift_threshold: The threshold of the drift detector (default is 0.2).
+    :return: A dictionary with the detected 'anomalies' and 'drift_points' indices.
+    """
+    series_scaled = scale_data(series)
+
+    detector = IsolationForestAnomalyDetector(contamination=contamination, n_estimators=n_estimators)
+    detector.fit(series_scaled)
+    anomalies = detector.predict(series_scaled)
+
+    drift_points = detect_simple_drift(series, window_size=window_size, drift_threshold=drift_threshold)
+    return {'anomalies': anomalies, 'drift_points': drift_points}
+
+
+def _process_shared_chunk(shm_name, dtype, total_size, bounds, params):
+    """
+    Worker task: attaches to the shared input buffer and processes a chunk of series without copying the input.
+
+    :param shm_name: Name of the shared memory block holding all series back to back.
+    :param dtype: The dtype of the shared buffer.
+    :param total_size: The total number of values in the shared buffer.
+    :param bounds: List of (start, end, n_features) offsets and feature counts of the series in this chunk.
+    :param params: Keyword arguments forwarded to process_series.
+    :return: A list with the result of each series in the chunk.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        values = np.ndarray((total_size,), dtype=dtype, buffer=shm.buf)
+        results = [process_series(as_series(values[start:end].reshape(-1, n_features)), **params)
+                   for start, end, n_features in bounds]
+        # Drop the view before closing, otherwise the buffer is still exported
+        del values
+        return results
+    finally:
+        shm.close()
+
+
+def _process_chunk(series_chunk, params):
+    """
+    Worker task for thread pools: processes a chunk of series that are shared by reference.
+
+    :param series_chunk: List of NumPy arrays, one per series.
+    :param params: Keyword arguments forwarded to process_series.
+    :return: A list with the result of each series in the chunk.
+    """
+    return [process_series(series, **params) for series in series_chunk]
+
+
+def run_batch(series_collection, executor='process', max_workers=None, chunk_size=16, **params):
+    """
+    Runs the detection pipeline on many independent series in parallel.
+
+    With a process pool, every series is packed once into a single shared memory block and workers only receive
+    its name and the offsets of their series, so large arrays are never pickled. With a thread pool, the series are
+    shared by reference. Series are scheduled in chunks of ``chunk_size`` to amortize the task overhead.
+
+    :param series_collection: A 2-D NumPy array (one series per row), a 3-D NumPy array (one multivariate series
+                              of shape (n_samples, n_features) per entry) or an iterable of such series.
+    :param executor: 'process' for a process pool or 'thread' for a thread pool (default is 'process').
+    :param max_workers: The number of workers in the pool (default is the number of CPUs).
+    :param chunk_size: The number of series handled by each task (default is 16).
+    :param params: Keyword arguments forwarded to process_series (contamination, n_estimators, window_size,
+                   drift_threshold).
+    :return: A list with one result dictionary per series, in input order.
+    :raises ValueError: If the executor type or the chunk size is invalid, or if any series is empty.
+    """
+    if executor not in ('process', 'thread'):
+        raise ValueError("The executor must be either 'process' or 'thread'.")
+    if chunk_size < 1:
+        raise ValueError("The chunk size must be positive.")
+
+    series_list = [as_series(np.asarray(series, dtype=float)) for series in series_collection]
+    if any(len(series) == 0 for series in series_list):
+        raise ValueError("The data stream is empty.")
+    if not series_list:
+        return []
+
+    max_workers = max_workers or os.cpu_count()
+    chunks = [range(i, min(i + chunk_size, len(series_list))) for i in range(0, len(series_list), chunk_size)]
+
+    if executor == 'thread':
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_process_chunk, [series_list[i] for i in chunk], params) for chunk in chunks]
+            return [result for future in futures for result in future.result()]
+
+    # Pack all series back to back into one shared memory block; multivariate series are stored row by row
+    offsets = np.concatenate(([0], np.cumsum([series.size for series in series_list])))
+    total_size = int(offsets[-1])
+    shm = shared_memory.SharedMemory(create=True, size=total_size * np.dtype(float).itemsize)
+    try:
+        shared_values = np.ndarray((total_size,), dtype=float, buffer=shm.buf)
+        for series, start in zip(series_list, offsets):
+            shared_values[start:start + series.size] = series.reshape(-1)
+        del shared_values
+
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [
+                pool.submit(_process_shared_chunk, shm.name, np.dtype(float).str, total_size,
+                            [(int(offsets[i]), int(offsets[i + 1]), series_list[i].size // len(series_list[i]))
+                             for i in chunk], params)
+                for chunk in chunks
+            ]
+            return [result for future in futures for result in future.result()]
+    finally:
+        shm.close()
+        shm.unlink()
@@ -0,0 +1,158 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import sklearn
+
+from anomaly_detector import IsolationForestAnomalyDetector
+from data_generator import generate_advanced_data_stream
+from data_scaler import scale_data
+from drift_detector import detect_simple_drift
+from utils import calculate_metrics
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+DEFAULT_N_ESTIMATORS = (50, 100, 200)
+
+
+def measure(func, repeat=3, setup=None):
+    """
+    Measures the best wall-clock time and the peak traced memory of a function.
+
+    The timing runs are made without tracemalloc, which slows allocations down; memory is measured in one extra run.
+
+    :param func: The function to benchmark; it receives the output of setup, if given.
+    :param repeat: The number of timing runs, the fastest is reported (default is 3).
+    :param setup: Optional function called before every run to build the argument of func (not measured).
+    :return: A tuple with the best time in seconds and the peak memory in megabytes.
+    """
+    seconds = float('inf')
+    for _ in range(repeat):
+        args = (setup(),) if setup else ()
+        start = time.perf_counter()
+        func(*args)
+        seconds = min(seconds, time.perf_counter() - start)
+
+    args = (setup(),) if setup else ()
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak / 1e6
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, n_estimators_values=DEFAULT_N_ESTIMATORS, repeat=3):
+    """
+    Benchmarks every stage of the detection pipeline across stream sizes and forest sizes.
+
+    :param sizes: The stream sizes to benchmark.
+    :param n_estimators_values: The numbers of trees to benchmark the Isolation Forest with.
+    :param repeat: The number of timing runs per measurement (default is 3).
+    :return: A list of result dictionaries with the stage, size, n_estimators, seconds and peak_memory_mb.
+    """
+    results = []
+
+    def record(stage, size, n_estimators, func, setup=None):
+        seconds, peak_memory_mb = measure(func, repeat=repeat, setup=setup)
+        results.append({'stage': stage, 'size': size, 'n_estimators': n_estimators,
+                        'seconds': seconds, 'peak_memory_mb': peak_memory_mb})
+        print(f'{stage:>10} size={size:<10} n_estimators={str(n_estimators):<5} '
+              f'{seconds:10.4f} s {peak_memory_mb:10.1f} MB', file=sys.stderr)
+
+    for size in sizes:
+        data_stream, true_anomalies = generate_advanced_data_stream(num_points=size)
+        data_stream_scaled = scale_data(data_stream)
+
+        record('generate', size, None, lambda: generate_advanced_data_stream(num_points=size))
+        record('scale', size, None, lambda: scale_data(data_stream))
+        record('drift', size, None, lambda: detect_simple_drift(data_stream))
+
+        if_anomalies = None
+        for n_estimators in n_estimators_values:
+            def new_detector():
+                return IsolationForestAnomalyDetector(contamination=0.05, n_estimators=n_estimators)
+
+            record('fit', size, n_estimators, lambda detector: detector.fit(data_stream_scaled), setup=new_detector)
+
+            detector = new_detector()
+            detector.fit(data_stream_scaled)
+            record('predict', size, n_estimators, lambda: detector.predict(data_stream_scaled))
+            if_anomalies = detector.predict(data_stream_scaled)
+
+        if if_anomalies is not None:
+            record('metrics', size, None, lambda: calculate_metrics(if_anomalies, true_anomalies))
+
+    return results
+
+
+def _result_key(result):
+    return result['stage'], result['size'], result['n_estimators']
+
+
+def compare_to_baseline(results, baseline, tolerance=0.2, min_seconds=1e-3):
+    """
+    Compares benchmark results against a stored baseline and lists the regressions.
+
+    :param results: The list of result dictionaries of the current run.
+    :param baseline: The list of result dictionaries of the baseline run.
+    :param tolerance: The relative slowdown (or memory growth) allowed before reporting a regression (default is 0.2).
+    :param min_seconds: Baseline timings below this are too noisy to compare and are skipped (default is 1 ms).
+    :return: A list of dictionaries describing each regressed measurement.
+    """
+    baseline_by_key = {_result_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        reference = baseline_by_key.get(_result_key(result))
+        if reference is None:
+            continue
+        for metric in ('seconds', 'peak_memory_mb'):
+            if metric == 'seconds' and reference[metric] < min_seconds:
+                continue
+            if reference[metric] > 0 and result[metric] > reference[metric] * (1 + tolerance):
+                regressions.append({'stage': result['stage'], 'size': result['size'],
+                                    'n_estimators': result['n_estimators'], 'metric': metric,
+                                    'baseline': reference[metric], 'current': result[metric],
+                                    'ratio': result[metric] / reference[metric]})
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the speed and memory of every pipeline stage.")
+    parser.add_argument('--sizes', type=lambda value: int(float(value)), nargs='+', default=DEFAULT_SIZES,
+                        help="Stream sizes to benchmark (scientific notation such as 1e6 is accepted).")
+    parser.add_argument('--n-estimators', type=int, nargs='+', default=DEFAULT_N_ESTIMATORS,
+                        help="Numbers of trees to benchmark the Isolation Forest with.")
+    parser.add_argument('--repeat', type=int, default=3, help="Timing runs per measurement; the best is kept.")
+    parser.add_argument('--output', default='benchmark_results.json', help="Where to write the JSON results.")
+    parser.add_argument('--baseline', help="A previous JSON results file to check for regressions.")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed relative slowdown before failing.")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.n_estimators, args.repeat)
+    report = {
+        'environment': {'python': platform.python_version(), 'numpy': np.__version__,
+                        'scikit-learn': sklearn.__version__, 'machine': platform.machine()},
+        'results': results,
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+        report['regressions'] = compare_to_baseline(results, baseline, args.tolerance)
+        for regression in report['regressions']:
+            print(f"Regression in {regression['stage']} (size={regression['size']}, "
+                  f"n_estimators={regression['n_estimators']}): {regression['metric']} "
+                  f"{regression['baseline']:.4f} -> {regression['current']:.4f} ({regression['ratio']:.2f}x)",
+                  file=sys.stderr)
+        exit_code = 1 if report['regressions'] else 0
+
+    with open(args.output, 'w') as output_file:
+        json.dump(report, output_file, indent=2)
+
+    sys.exit(exit_code)
@@ -1,7 +1,41 @@
 import numpy as np
 
+from instrumentation import timed
+
+
+def _random_generator(random_state):
+    """
+    Returns the source of randomness for the generators.
+
+    :param random_state: None to use the global NumPy random state, a seed, or a np.random.Generator.
+    :return: An object exposing standard_normal, uniform, random and choice.
+    """
+    if random_state is None:
+        return np.random
+    return np.random.default_rng(random_state)
+
+
+def _base_signal(x, trend_factor, seasonality_period, dtype):
+    """
+    Computes the deterministic trend and seasonality components at the given indices.
+
+    The seasonal phase is reduced modulo the period first, so the components stay accurate in float32 even for
+    very large indices.
+
+    :param x: NumPy array of stream indices.
+    :param trend_factor: The slope of the linear trend component.
+    :param seasonality_period: The period of the sinusoidal seasonality component.
+    :param dtype: The floating point type of the output.
+    :return: A NumPy array with the trend plus seasonality.
+    """
+    phase = (2 * np.pi / seasonality_period) * (x % seasonality_period)
+    return (trend_factor * x + np.sin(phase) + np.cos(2 * phase)).astype(dtype, copy=False)
+
+
+@timed('generate')
 def generate_advanced_data_stream(num_points=1000, noise_level=0.05, anomaly_freq=0.05, trend_factor=0.001,
-                                  seasonality_period=200, anomaly_magnitude=4, drift_frequency=700):
+                                  seasonality_period=200, anomaly_magnitude=4, drift_frequency=700,
+                                  random_state=None, dtype=np.float64):
     """
     Generates a synthetic data stream with trend, seasonality, noise, drift, and anomalies.
 
@@ -19,30 +53,124 @@ def generate_advanced_data_stream(num_points=1000, noise_level=0.05, anomaly_fre
     :param seasonality_period: The period of the sinusoidal seasonality component (default is 200).
     :param anomaly_magnitude: The magnitude of the anomalies introduced (default is 4).
     :param drift_frequency: The frequency (number of points) at which drift is introduced (default is 700).
+    :param random_state: Seed or np.random.Generator for reproducible streams; None uses the global NumPy random
+                         state (default is None).
+    :param dtype: The floating point type of the generated stream (default is float64).
     :return: A tuple containing:
              - data_stream: The generated data stream (NumPy array).
              - anomaly_indices: The indices of the introduced anomalies.
     """
-    # Create a linear trend component
+    rng = _random_generator(random_state)
+
+    # Create the linear trend and the seasonality components using sine and cosine functions
     x = np.arange(num_points)
-    trend = trend_factor * np.arange(num_points)
+    data_stream = _base_signal(x, trend_factor, seasonality_period, dtype)
 
     # Add random noise
-    noise = noise_level * np.random.randn(num_points)
-
-    # Create a seasonality component using sine and cosine functions
-    seasonality = np.sin(2 * np.pi * x / seasonality_period) + np.cos(4 * np.pi * x / seasonality_period)
+    data_stream += noise_level * rng.standard_normal(num_points)
 
-    # Introduce drift by periodically shifting the baseline of the data
-    drift = np.zeros(num_points)
-    for i in range(0, num_points, drift_frequency):
-        drift[i:] += np.random.uniform(-1, 1)  # Add a random shift to the remaining data after each interval
-
-    # Combine the trend, seasonality, noise, and drift components to form the final data stream
-    data_stream = trend + seasonality + noise + drift
+    # Introduce drift by periodically shifting the baseline of the data: each interval adds a random shift to the
+    # remaining data, i.e. a cumulative step function
+    shifts = rng.uniform(-1, 1, size=-(-num_points // drift_frequency))
+    data_stream += np.cumsum(shifts)[x // drift_frequency]
 
     # Introduce anomalies at random positions
-    anomaly_indices = np.random.choice(num_points, int(num_points * anomaly_freq), replace=False)
-    data_stream[anomaly_indices] += np.random.uniform(anomaly_magnitude, anomaly_magnitude * 2, size=anomaly_indices.size)
+    anomaly_indices = rng.choice(num_points, int(num_points * anomaly_freq), replace=False)
+    data_stream[anomaly_indices] += rng.uniform(anomaly_magnitude, anomaly_magnitude * 2, size=anomaly_indices.size)
 
     return data_stream, anomaly_indices
+
+
+def generate_stream_chunks(chunk_size=100_000, num_points=None, noise_level=0.05, anomaly_freq=0.05,
+                           trend_factor=0.001, seasonality_period=200, anomaly_magnitude=4, drift_frequency=700,
+                           random_state=None, dtype=np.float32):
+    """
+    Generates an arbitrarily long synthetic data stream chunk by chunk.
+
+    The stream has the same components as generate_advanced_data_stream; the drift level is carried over from one
+    chunk to the next, so memory only depends on the chunk size.
+
+    :param chunk_size: The number of points per chunk (default is 100000).
+    :param num_points: The total number of points, or None for an endless stream (default is None).
+    :param noise_level: The standard deviation of the random noise added to the data (default is 0.05).
+    :param anomaly_freq: The frequency of anomalies, as a proportion of the number of points (default is 0.05).
+    :param trend_factor: The slope of the linear trend component in the data (default is 0.001).
+    :param seasonality_period: The period of the sinusoidal seasonality component (default is 200).
+    :param anomaly_magnitude: The magnitude of the anomalies introduced (default is 4).
+    :param drift_frequency: The frequency (number of points) at which drift is introduced (default is 700).
+    :param random_state: Seed or np.random.Generator for reproducible streams (default is None).
+    :param dtype: The floating point type of the generated chunks, float32 or float64 (default is float32).
+    :return: A generator of (chunk, anomaly_indices) tuples, where the anomaly indices are global stream positions.
+    :raises ValueError: If the chunk size is not positive.
+    """
+    if chunk_size < 1:
+        raise ValueError("The chunk size must be positive.")
+
+    rng = np.random.default_rng(random_state)
+    drift_level = 0.0
+    start = 0
+    while num_points is None or start < num_points:
+        end = start + chunk_size if num_points is None else min(start + chunk_size, num_points)
+        x = np.arange(start, end)
+        chunk = _base_signal(x, trend_factor, seasonality_period, dtype)
+        chunk += noise_level * rng.standard_normal(len(x), dtype=dtype)
+
+        # Drift steps falling inside this chunk, on top of the level accumulated so far
+        steps = np.arange(-(-start // drift_frequency) * drift_frequency, end, drift_frequency)
+        levels = drift_level + np.concatenate(([0.0], np.cumsum(rng.uniform(-1, 1, size=len(steps)))))
+        chunk += levels[np.searchsorted(steps, x, side='right')].astype(dtype, copy=False)
+        drift_level = levels[-1]
+
+        anomaly_positions = rng.choice(len(x), int(len(x) * anomaly_freq), replace=False)
+        chunk[anomaly_positions] += rng.uniform(anomaly_magnitude, anomaly_magnitude * 2, size=anomaly_positions.size)
+
+        yield chunk, anomaly_positions + start
+        start = end
+
+
+def generate_multiple_streams(num_series, num_points=1000, noise_level=0.05, anomaly_freq=0.05, trend_factor=0.001,
+                              seasonality_period=200, anomaly_magnitude=4, drift_frequency=700, random_state=None,
+                              dtype=np.float32):
+    """
+    Generates many independent synthetic data streams at once as a 2-D array.
+
+    Every series shares the trend and seasonality shape but has its own noise, drift and anomalies, all drawn in
+    vectorized form.
+
+    :param num_series: The number of series to generate.
+    :param num_points: The number of points per series (default is 1000).
+    :param noise_level: The standard deviation of the random noise added to the data (default is 0.05).
+    :param anomaly_freq: The frequency of anomalies, as a proportion of the number of points (default is 0.05).
+    :param trend_factor: The slope of the linear trend component in the data (default is 0.001).
+    :param seasonality_period: The period of the sinusoidal seasonality component (default is 200).
+    :param anomaly_magnitude: The magnitude of the anomalies introduced (default is 4).
+    :param drift_frequency: The frequency (number of points) at which drift is introduced (default is 700).
+    :param random_state: Seed or np.random.Generator for reproducible streams (default is None).
+    :param dtype: The floating point type of the generated streams, float32 or float64 (default is float32).
+    :return: A tuple containing:
+             - data_streams: NumPy array of shape (num_series, num_points).
+             - anomaly_indices: NumPy array of shape (num_series, n_anomalies) with the anomaly indices of each series.
+    """
+    rng = np.random.default_rng(random_state)
+    x = np.arange(num_points)
+
+    data_streams = np.empty((num_series, num_points), dtype=dtype)
+    data_streams[:] = _base_signal(x, trend_factor, seasonality_period, dtype)
+    data_streams += noise_level * rng.standard_normal((num_series, num_points), dtype=dtype)
+
+    # Cumulative step drift, one random walk per series
+    shifts = rng.uniform(-1, 1, size=(num_series, -(-num_points // drift_frequency))).astype(dtype)
+    data_streams += np.cumsum(shifts, axis=1)[:, x // drift_frequency]
+
+    # Pick distinct anomaly positions per series by partitioning random keys
+    n_anomalies = int(num_points * anomaly_freq)
+    if n_anomalies < num_points:
+        keys = rng.random((num_series, num_points), dtype=np.float32)
+        anomaly_indices = np.argpartition(keys, n_anomalies, axis=1)[:, :n_anomalies]
+    else:
+        anomaly_indices = np.tile(x, (num_series, 1))
+    rows = np.arange(num_series)[:, None]
+    data_streams[rows, anomaly_indices] += rng.uniform(anomaly_magnitude, anomaly_magnitude * 2,
+                                                       size=anomaly_indices.shape)
+
+    return data_streams, anomaly_indices
@@ -1,6 +1,11 @@
+import numpy as np
 from sklearn.preprocessing import StandardScaler
 
+from features import as_samples, as_series
+from instrumentation import timed
 
+
+@timed('scale')
 def scale_data(data_stream):
     """
     Scales the data stream using standard normalization.
@@ -8,8 +13,10 @@ def scale_data(data_stream):
     This function scales the input data stream to have a mean of 0 and a standard deviation of 1, which is useful
     for improving the performance of anomaly detection models such as Isolation Forest.
 
-    :param data_stream: Array-like object representing the data stream values.
-    :return: A scaled version of the data stream with shape (-1, 1).
+    :param data_stream: Array-like object representing the data stream values, one value or one row of features
+                        per point; each feature is scaled independently.
+    :return: A scaled version of the data stream with shape (n_samples, n_features), i.e. (-1, 1) for one value
+             per point.
     :raises ValueError: If the input data stream is empty.
     """
     if len(data_stream) == 0:
@@ -18,5 +25,145 @@ def scale_data(data_stream):
     # Initialize the StandardScaler to normalize the data stream
     scaler = StandardScaler()
 
-    # Reshape the data and apply the scaling transformation
-    return scaler.fit_transform(data_stream.reshape(-1, 1))
+    # Reshape the data into a matrix of samples and apply the scaling transformation
+    return scaler.fit_transform(as_samples(data_stream))
+
+
+class StreamingScaler:
+    """
+    An incremental standard scaler for data streams.
+
+    The running mean and variance are updated chunk by chunk with Welford's algorithm (in its parallel form), so the
+    statistics can be fitted once, extended with new data, saved and reloaded. Transforming a chunk costs a single
+    multiply-add written into a preallocated buffer, with no refit and no reallocation.
+
+    Multivariate streams (one row of features per point) keep one mean and variance per feature; for a single
+    metric they are scalars.
+    """
+
+    def __init__(self, dtype=np.float64):
+        """
+        Initializes an empty StreamingScaler.
+
+        :param dtype: The floating point type of the transformed output, np.float32 or np.float64 (default).
+        """
+        self.dtype = np.dtype(dtype)
+        self.n_samples_seen = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared deviations from the running mean
+        self._buffer = np.empty(0, dtype=self.dtype)
+
+    @property
+    def var(self):
+        """
+        The population variance of all the data seen so far.
+        """
+        return self.m2 / self.n_samples_seen if self.n_samples_seen else 0.0
+
+    @property
+    def scale(self):
+        """
+        The standard deviation used for scaling (1 for constant data, as in StandardScaler).
+        """
+        std = np.sqrt(self.var)
+        if np.ndim(std):
+            return np.where(std > 0, std, 1.0)
+        return std if std > 0 else 1.0
+
+    @property
+    def _n_features(self):
+        """
+        The number of features of the fitted data, or None for a single metric or an unfitted scaler.
+        """
+        return len(self.mean) if np.ndim(self.mean) else None
+
+    def partial_fit(self, chunk):
+        """
+        Updates the running mean and variance with a new chunk of the data stream.
+
+        :param chunk: Array-like object representing new data stream values, one value or one row of features per
+                      point.
+        :return: The scaler itself.
+        :raises ValueError: If the chunk is empty or its features differ from those already seen.
+        """
+        chunk = as_series(np.asarray(chunk, dtype=np.float64), self._n_features)
+        if len(chunk) == 0:
+            raise ValueError("The data stream is empty.")
+
+        # Merge the chunk statistics into the running ones (Chan et al. parallel variant of Welford), per feature
+        n = len(chunk)
+        chunk_mean = chunk.mean(axis=0)
+        if self.n_samples_seen and np.shape(chunk_mean) != np.shape(self.mean):
+            raise ValueError("The chunk does not have the same number of features as the fitted data.")
+        chunk_m2 = np.square(chunk - chunk_mean).sum(axis=0)
+        total = self.n_samples_seen + n
+        delta = chunk_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += chunk_m2 + delta ** 2 * self.n_samples_seen * n / total
+        self.n_samples_seen = total
+        return self
+
+    def transform(self, chunk, out=None):
+        """
+        Scales a chunk of the data stream with the current statistics.
+
+        Unless ``out`` is given, the result is written into an internal buffer that is reused (and overwritten)
+        by the next call, so copy it if it has to outlive the next transform.
+
+        :param chunk: Array-like object representing data stream values.
+        :param out: Optional preallocated array with as many elements as the chunk to write the result into.
+        :return: The scaled chunk with shape (n_samples, n_features), i.e. (-1, 1) for a single metric.
+        :raises ValueError: If the scaler has not been fitted yet or the chunk has other features than the fitted
+                            data.
+        """
+        if self.n_samples_seen == 0:
+            raise ValueError("The scaler has not been fitted yet.")
+
+        chunk = as_series(chunk, self._n_features)
+        if chunk.shape[1:] != np.shape(self.mean):
+            raise ValueError("The chunk does not have the same number of features as the fitted data.")
+        if out is None:
+            if len(self._buffer) < chunk.size:
+                self._buffer = np.empty(chunk.size, dtype=self.dtype)
+            out = self._buffer[:chunk.size]
+
+        # (x - mean) / scale as a single multiply-add, broadcast over the features
+        factor = 1.0 / self.scale
+        target = out.reshape(chunk.shape)
+        np.multiply(chunk, factor, out=target, casting='unsafe')
+        target -= self.mean * factor
+        return target.reshape(len(chunk), -1)
+
+    def fit_transform(self, chunk, out=None):
+        """
+        Updates the statistics with a chunk and scales it.
+
+        :param chunk: Array-like object representing data stream values.
+        :param out: Optional preallocated array to write the result into.
+        :return: The scaled chunk with shape (n_samples, n_features).
+        """
+        return self.partial_fit(chunk).transform(chunk, out=out)
+
+    def save(self, path):
+        """
+        Saves the scaler statistics to a NumPy ``.npz`` file.
+
+        :param path: Destination file path.
+        """
+        np.savez(path, n_samples_seen=self.n_samples_seen, mean=self.mean, m2=self.m2, dtype=self.dtype.str)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a scaler previously stored with save.
+
+        :param path: Path of the ``.npz`` file.
+        :return: A fitted StreamingScaler.
+        """
+        with np.load(path) as state:
+            scaler = cls(dtype=str(state['dtype']))
+            scaler.n_samples_seen = int(state['n_samples_seen'])
+            # 0-d arrays (a single metric) are loaded back as scalars, per-feature statistics as arrays
+            scaler.mean = state['mean'][()]
+            scaler.m2 = state['m2'][()]
+        return scaler
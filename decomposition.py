@@ -0,0 +1,142 @@
+import numpy as np
+
+from features import as_series
+
+
+class SeasonalDecomposer:
+    """
+    An incremental trend and seasonality remover for data streams.
+
+    The trend is a trailing moving average over one seasonal period, and the seasonal profile keeps one
+    exponentially weighted average of the detrended value per phase of the period. Both are updated in O(1) per
+    point, processed one period at a time so each phase is updated at most once per step, which keeps the updates
+    vectorized. Only the residual (value - trend - seasonal) is left for the anomaly detector.
+
+    The first period is a warm-up: phases seen for the first time initialize the profile and get a residual of 0,
+    unless the profile was primed from history with fit_profile. Multivariate streams (one row of features per
+    point) are decomposed feature by feature.
+    """
+
+    def __init__(self, seasonality_period, seasonal_smoothing=0.1):
+        """
+        Initializes the SeasonalDecomposer.
+
+        :param seasonality_period: The number of points in one seasonal period.
+        :param seasonal_smoothing: The weight of a new observation in the seasonal profile, between 0 and 1
+                                   (default is 0.1).
+        :raises ValueError: If the period or the smoothing factor is invalid.
+        """
+        if seasonality_period < 1:
+            raise ValueError("The seasonality period must be positive.")
+        if not 0 < seasonal_smoothing <= 1:
+            raise ValueError("The seasonal smoothing must be between 0 and 1.")
+
+        self.seasonality_period = int(seasonality_period)
+        self.seasonal_smoothing = seasonal_smoothing
+        self.seasonal = np.zeros(self.seasonality_period)
+        self.n_seen = 0
+        self._initialized = np.zeros(self.seasonality_period, dtype=bool)
+        # Ring buffer of the last seasonality_period values (zeros before the stream fills it) and their running sum,
+        # for the trailing moving average
+        self._ring = np.zeros(self.seasonality_period)
+        self._window_sum = 0.0
+
+    def _as_values(self, values):
+        """
+        Converts new values to an array matching the state of the decomposer, allocating per-feature state the first
+        time multivariate values are seen.
+
+        :param values: Array-like object of new values, one value or one row of features per point.
+        :return: A one- or two-dimensional float NumPy array.
+        :raises ValueError: If the values have other features than those seen before.
+        """
+        n_features = self.seasonal.shape[1] if self.seasonal.ndim > 1 else None
+        values = as_series(np.atleast_1d(np.asarray(values, dtype=float)), n_features)
+        if values.shape[1:] != self.seasonal.shape[1:]:
+            if self.n_seen or self._initialized.any():
+                raise ValueError("The values do not have the same number of features as the previous ones.")
+            self.seasonal = np.zeros((self.seasonality_period,) + values.shape[1:])
+            self._ring = np.zeros((self.seasonality_period,) + values.shape[1:])
+        return values
+
+    def _trend(self, values):
+        """
+        Computes the trailing moving average over one period for each new value, in O(1) per value.
+
+        The running window sum gains each new value and loses the one a period earlier, read from the ring buffer
+        (or from the chunk itself once the chunk is longer than a period).
+
+        :param values: NumPy array of new values, as returned by _as_values.
+        :return: A NumPy array with the trend at each new value.
+        """
+        n_values = len(values)
+        n_recent = min(n_values, self.seasonality_period)
+        slots = (self.n_seen + np.arange(n_values)) % self.seasonality_period
+
+        leaving = np.empty_like(values)
+        leaving[:n_recent] = self._ring[slots[:n_recent]]
+        leaving[n_recent:] = values[:n_values - n_recent]
+        window_sums = self._window_sum + np.cumsum(values - leaving, axis=0)
+        if n_values:
+            self._window_sum = window_sums[-1]
+        self._ring[slots[n_values - n_recent:]] = values[n_values - n_recent:]
+
+        # At the start of the stream the window holds fewer than a period of values
+        window_sizes = np.minimum(self.n_seen + np.arange(1, n_values + 1), self.seasonality_period)
+        return window_sums / window_sizes.reshape((-1,) + (1,) * (values.ndim - 1))
+
+    def fit_profile(self, values):
+        """
+        Primes the seasonal profile from a batch of history, avoiding the warm-up period of transform.
+
+        The profile is set to the per-phase median of the detrended values, which is robust to the anomalies they
+        may contain. The values are assumed to start at phase 0 and the stream position is left unchanged, so the
+        same values can then be passed to transform.
+
+        :param values: Array-like object of historical data stream values, ideally spanning several periods.
+        :return: The decomposer itself.
+        :raises ValueError: If the values do not cover a full seasonal period or have other features than before.
+        """
+        values = self._as_values(values)
+        if len(values) < self.seasonality_period:
+            raise ValueError("At least one full seasonal period is needed to fit the profile.")
+
+        # Detrend with a throwaway decomposer so the state of this one is not advanced
+        throwaway = SeasonalDecomposer(self.seasonality_period)
+        detrended = values - throwaway._trend(throwaway._as_values(values))
+        n_periods = -(-len(values) // self.seasonality_period)
+        padded = np.full((n_periods * self.seasonality_period,) + values.shape[1:], np.nan)
+        padded[:len(values)] = detrended
+        self.seasonal = np.nanmedian(padded.reshape((n_periods, self.seasonality_period) + values.shape[1:]), axis=0)
+        self._initialized[:] = True
+        return self
+
+    def transform(self, values):
+        """
+        Updates the trend and seasonal profile with new values and returns their residuals.
+
+        :param values: Array-like object of new data stream values, one value or one row of features per point.
+        :return: A NumPy array of residuals with the same shape as values.
+        :raises ValueError: If the values have other features than those seen before.
+        """
+        values = self._as_values(values)
+        residuals = np.empty(values.shape)
+        detrended = values - self._trend(values)
+
+        # One period at a time, so every phase occurs at most once per vectorized update
+        for start in range(0, len(values), self.seasonality_period):
+            end = min(start + self.seasonality_period, len(values))
+            phases = (self.n_seen + np.arange(start, end)) % self.seasonality_period
+            current = detrended[start:end]
+
+            initialized = self._initialized[phases].reshape((-1,) + (1,) * (values.ndim - 1))
+            residuals[start:end] = np.where(initialized, current - self.seasonal[phases], 0.0)
+            self.seasonal[phases] = np.where(initialized,
+                                             self.seasonal[phases] + self.seasonal_smoothing *
+                                             (current - self.seasonal[phases]),
+                                             current)
+            self._initialized[phases] = True
+
+        self.n_seen += len(values)
+        return residuals
+
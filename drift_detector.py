@@ -1,5 +1,31 @@
 import numpy as np
 
+from features import as_series
+from instrumentation import timed
+
+
+def _drift_indices(data_stream, window_size, drift_threshold):
+    """
+    Finds drift points by comparing consecutive rolling means in a vectorized way.
+
+    Two consecutive rolling means over ``window_size`` points differ by exactly
+    ``(data_stream[k + window_size] - data_stream[k]) / window_size``, so the rolling mean itself never has to be
+    materialized. The batch function and the online detector share this helper to return identical indices.
+    For multivariate streams, a point is a drift point as soon as one of the features drifts.
+
+    :param data_stream: NumPy array of shape (n_samples,) or (n_samples, n_features).
+    :param window_size: The size of the moving window used to calculate the rolling mean.
+    :param drift_threshold: The threshold on the difference between consecutive rolling means.
+    :return: A NumPy array of indices (relative to the start of data_stream) where drift was detected.
+    """
+    mean_differences = np.abs(data_stream[window_size:] - data_stream[:-window_size]) / window_size
+    drifted = mean_differences > drift_threshold
+    if drifted.ndim > 1:
+        drifted = drifted.any(axis=1)
+    return np.nonzero(drifted)[0] + window_size + 1
+
+
+@timed('drift')
 def detect_simple_drift(data_stream, window_size=50, drift_threshold=0.2):
     """
     Detects drift points in a data stream based on abrupt changes in the rolling mean.
@@ -8,21 +34,109 @@ def detect_simple_drift(data_stream, window_size=50, drift_threshold=0.2):
     and identifying points where the difference between consecutive rolling mean values exceeds a given threshold.
     These points are considered as drift points, indicating potential shifts in the underlying data distribution.
 
-    :param data_stream: Array-like object representing the data stream values.
+    :param data_stream: Array-like object representing the data stream values, one value or one row of features
+                        per point.
     :param window_size: The size of the moving window used to calculate the rolling mean (default is 50).
     :param drift_threshold: The threshold that determines how large the difference between consecutive rolling mean values
                             must be to consider it as drift (default is 0.2).
     :return: A NumPy array of indices where drift was detected.
+    :raises ValueError: If the window size is not positive.
+    """
+    if window_size < 1:
+        raise ValueError("The window size must be positive.")
+
+    data_stream = as_series(np.asarray(data_stream, dtype=float))
+    return _drift_indices(data_stream, window_size, drift_threshold)
+
+
+def debounce_drift_points(drift_points, cooldown=100, stream_length=None):
+    """
+    Collapses bursts of adjacent drift points into single retraining points.
+
+    A drift point is kept only if it lies at least ``cooldown`` points after the previously kept one (the start of
+    the stream counts as kept), so a burst of nearby detections triggers one retrain. When ``stream_length`` is
+    given, points that would leave fewer than ``cooldown`` points until the end of the stream are dropped as well.
+
+    :param drift_points: Array-like object of drift indices.
+    :param cooldown: The minimum distance between two retraining points (default is 100).
+    :param stream_length: The length of the data stream, or None to keep trailing points (default is None).
+    :return: A NumPy array of the indices where the stream should be segmented.
     """
-    drift_points = []  # List to store the indices where drift is detected
+    kept = []
+    last = 0
+    for point in np.unique(np.asarray(drift_points, dtype=int)):
+        if point - last >= cooldown:
+            kept.append(point)
+            last = point
+
+    kept = np.array(kept, dtype=int)
+    if stream_length is not None:
+        kept = kept[kept <= stream_length - cooldown]
+    return kept
+
+
+class OnlineDriftDetector:
+    """
+    A stateful drift detector that consumes a data stream one sample or one chunk at a time.
+
+    Only the last ``window_size`` samples are kept, so each new sample costs O(1) and history is never re-scanned.
+    The returned drift indices are global stream positions, identical to those of detect_simple_drift on the
+    concatenated stream.
+    """
+
+    def __init__(self, window_size=50, drift_threshold=0.2):
+        """
+        Initializes the OnlineDriftDetector.
+
+        :param window_size: The size of the moving window used to calculate the rolling mean (default is 50).
+        :param drift_threshold: The threshold on the difference between consecutive rolling means (default is 0.2).
+        :raises ValueError: If the window size is not positive.
+        """
+        if window_size < 1:
+            raise ValueError("The window size must be positive.")
+
+        self.window_size = window_size
+        self.drift_threshold = drift_threshold
+        self.n_seen = 0  # Number of samples consumed so far
+        self._ring = None  # Ring buffer of the last window_size samples, allocated on the first update
+
+    def update(self, values):
+        """
+        Consumes one sample or a chunk of samples and returns the drift points they reveal.
+
+        :param values: A single value, an array-like object of new values, or one row of features per new point; once
+                       the detector has seen multivariate points, a one-dimensional array is a single point.
+        :return: A NumPy array of global stream indices where drift was detected.
+        """
+        n_features = self._ring.shape[1] if self._ring is not None and self._ring.ndim > 1 else None
+        values = as_series(np.atleast_1d(np.asarray(values, dtype=float)), n_features)
+        if self._ring is None:
+            self._ring = np.zeros((self.window_size,) + values.shape[1:])
+        elif values.shape[1:] != self._ring.shape[1:]:
+            raise ValueError("The values do not have the same number of features as the previous ones.")
 
-    # Calculate the rolling mean of the data stream with the specified window size
-    rolling_mean = np.convolve(data_stream, np.ones(window_size) / window_size, mode='valid')
+        # The sample window_size steps before each new one comes from the ring buffer, or from the chunk itself
+        # once the chunk is longer than the window
+        n_values = len(values)
+        n_recent = min(n_values, self.window_size)
+        positions = self.n_seen + np.arange(n_values)
+        slots = positions % self.window_size
+        previous = np.empty_like(values)
+        previous[:n_recent] = self._ring[slots[:n_recent]]
+        previous[n_recent:] = values[:n_values - n_recent]
+        self._ring[slots[n_values - n_recent:]] = values[n_values - n_recent:]
+        self.n_seen += n_values
 
-    # Compare consecutive rolling mean values to detect drift
-    for i in range(1, len(rolling_mean)):
-        # If the absolute difference between consecutive rolling means exceeds the threshold, record the drift point
-        if np.abs(rolling_mean[i] - rolling_mean[i - 1]) > drift_threshold:
-            drift_points.append(i + window_size)
+        # Same test as _drift_indices, for the samples that have a full window before them
+        drifted = np.abs(values - previous) / self.window_size > self.drift_threshold
+        if drifted.ndim > 1:
+            drifted = drifted.any(axis=1)
+        drifted &= positions >= self.window_size
+        return positions[drifted] + 1
 
-    return np.array(drift_points)
+    def reset(self):
+        """
+        Clears the detector state so it can be reused on a new stream.
+        """
+        self.n_seen = 0
+        self._ring = None
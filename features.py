@@ -0,0 +1,194 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _single_sample(data_stream, n_features):
+    """
+    Reads a one-dimensional array as a single sample when the consumer is known to expect several features.
+
+    :param data_stream: NumPy array.
+    :param n_features: The number of features expected, or None when it is not known yet.
+    :return: The data stream, as a (1, n_features) matrix if it is a single multivariate sample.
+    :raises ValueError: If a one-dimensional array does not match the expected number of features.
+    """
+    if n_features is None or n_features == 1 or data_stream.ndim != 1:
+        return data_stream
+    if len(data_stream) != n_features:
+        raise ValueError(f"Expected samples of {n_features} features, got a one-dimensional array of "
+                         f"{len(data_stream)} values.")
+    return data_stream.reshape(1, -1)
+
+
+def as_samples(data_stream, n_features=None):
+    """
+    Returns the data stream as a (n_samples, n_features) matrix; one-dimensional streams become a single column.
+
+    :param data_stream: Array-like object of shape (n_samples,) or (n_samples, n_features), or a single sample of
+                        shape (n_features,) when n_features is given.
+    :param n_features: The number of features expected, or None if it is not known yet (default is None).
+    :return: A two-dimensional NumPy array (a view whenever possible).
+    :raises ValueError: If a one-dimensional array does not match the expected number of features.
+    """
+    data_stream = _single_sample(np.asarray(data_stream), n_features)
+    if data_stream.ndim == 1:
+        return data_stream.reshape(-1, 1)
+    return data_stream.reshape(len(data_stream), -1)
+
+
+def as_series(data_stream, n_features=None):
+    """
+    Returns a univariate data stream as a one-dimensional array and a multivariate one as a (n_samples, n_features)
+    matrix, so that per-feature statistics of a single metric stay scalars.
+
+    Until the number of features is known, a one-dimensional array is read as univariate points.
+
+    :param data_stream: Array-like object of shape (n_samples,), (n_samples, 1) or (n_samples, n_features), or a
+                        single sample of shape (n_features,) when n_features is given.
+    :param n_features: The number of features expected, or None if it is not known yet (default is None).
+    :return: A one- or two-dimensional NumPy array (a view whenever possible).
+    :raises ValueError: If a one-dimensional array does not match the expected number of features.
+    """
+    data_stream = _single_sample(np.asarray(data_stream), n_features)
+    if data_stream.size == len(data_stream):
+        return data_stream.reshape(-1)
+    return data_stream.reshape(len(data_stream), -1)
+
+
+def lag_features(data_stream, n_lags):
+    """
+    Builds a feature matrix of each sample and its previous n_lags samples as a zero-copy strided view.
+
+    The rows of a contiguous, time-reversed copy of the stream are windowed as one flat buffer, so every row of the
+    result is a view over n_lags + 1 consecutive samples. The first n_lags rows repeat the first sample for their
+    missing history; apart from that single padded copy of the input, no memory is allocated for the matrix.
+
+    :param data_stream: Array-like object of shape (n_samples,) or (n_samples, n_features).
+    :param n_lags: The number of previous samples added to each row.
+    :return: A read-only NumPy array of shape (n_samples, (n_lags + 1) * n_features), with the features of the
+             current sample first, then those of the previous one, and so on.
+    :raises ValueError: If the number of lags is negative or the data stream is empty.
+    """
+    if n_lags < 0:
+        raise ValueError("The number of lags cannot be negative.")
+    samples = as_samples(np.asarray(data_stream, dtype=float))
+    if len(samples) == 0:
+        raise ValueError("The data stream is empty.")
+
+    n_features = samples.shape[1]
+    reversed_padded = np.concatenate((samples[::-1], np.repeat(samples[:1], n_lags, axis=0)))
+    windows = sliding_window_view(reversed_padded.reshape(-1), (n_lags + 1) * n_features)[::n_features]
+    return windows[::-1]
+
+
+def _rolling_moments(samples, window_size):
+    """
+    Computes the mean and standard deviation over the trailing window of each sample, in O(1) per sample.
+
+    Window sums are differences of cumulative sums, which lose precision when the sums grow large compared with the
+    spread of a window. The cumulative sums are therefore restarted for every block of samples (plus the window_size
+    - 1 samples before it) and taken over values centred on the mean of that block.
+
+    :param samples: NumPy array of shape (n_samples, n_features).
+    :param window_size: The size of the trailing window.
+    :return: A tuple of NumPy arrays with the rolling means and standard deviations, shaped like samples.
+    """
+    means = np.empty(samples.shape)
+    stds = np.empty(samples.shape)
+    block_size = max(4 * window_size, 1024)
+    for start in range(0, len(samples), block_size):
+        end = min(start + block_size, len(samples))
+        context = max(start - window_size + 1, 0)
+        block = samples[context:end]
+        centre = block.mean(axis=0)
+
+        # Cumulative sums with a leading zero row, so that every window sum is a difference of two rows
+        sums = np.zeros((len(block) + 1,) + block.shape[1:])
+        squares = np.zeros_like(sums)
+        np.cumsum(block - centre, axis=0, out=sums[1:])
+        np.cumsum(np.square(block - centre), axis=0, out=squares[1:])
+
+        rows = np.arange(start, end) - context + 1
+        firsts = np.maximum(rows - window_size, 0)
+        counts = (rows - firsts)[:, np.newaxis]
+        mean = (sums[rows] - sums[firsts]) / counts
+        variance = (squares[rows] - squares[firsts]) / counts - np.square(mean)
+        means[start:end] = mean + centre
+        stds[start:end] = np.sqrt(np.maximum(variance, 0.0))
+    return means, stds
+
+
+def rolling_features(data_stream, window_size, stats=('mean', 'std')):
+    """
+    Computes rolling statistics over the trailing window of each sample.
+
+    Means and standard deviations use blockwise, centred cumulative sums; minima and maxima reduce a strided window
+    view, so the windows themselves are never materialized. At the start of the stream the window holds the samples
+    seen so far.
+
+    :param data_stream: Array-like object of shape (n_samples,) or (n_samples, n_features).
+    :param window_size: The size of the trailing window.
+    :param stats: The statistics to compute, among 'mean', 'std', 'min' and 'max' (default is ('mean', 'std')).
+    :return: A NumPy array of shape (n_samples, len(stats) * n_features), one block of columns per statistic.
+    :raises ValueError: If the window size is not positive, the stream is empty or a statistic is unknown.
+    """
+    if window_size < 1:
+        raise ValueError("The window size must be positive.")
+    samples = as_samples(np.asarray(data_stream, dtype=float))
+    if len(samples) == 0:
+        raise ValueError("The data stream is empty.")
+
+    moments = None
+    columns = []
+    for stat in stats:
+        if stat in ('mean', 'std'):
+            if moments is None:
+                moments = _rolling_moments(samples, window_size)
+            columns.append(moments[0] if stat == 'mean' else moments[1])
+        elif stat in ('min', 'max'):
+            # Padding with the first sample leaves the extremum of the partial windows unchanged
+            padded = np.concatenate((np.repeat(samples[:1], window_size - 1, axis=0), samples))
+            windows = sliding_window_view(padded, window_size, axis=0)
+            columns.append(windows.min(axis=-1) if stat == 'min' else windows.max(axis=-1))
+        else:
+            raise ValueError(f"Unknown rolling statistic: {stat}.")
+    return np.hstack(columns)
+
+
+def delta_features(data_stream, lag=1):
+    """
+    Computes the difference between each sample and the sample ``lag`` steps before it.
+
+    :param data_stream: Array-like object of shape (n_samples,) or (n_samples, n_features).
+    :param lag: The distance between the compared samples (default is 1).
+    :return: A NumPy array of shape (n_samples, n_features), 0 for the first lag samples.
+    :raises ValueError: If the lag is not positive.
+    """
+    if lag < 1:
+        raise ValueError("The lag must be positive.")
+    samples = as_samples(np.asarray(data_stream, dtype=float))
+
+    deltas = np.zeros(samples.shape)
+    np.subtract(samples[lag:], samples[:-lag], out=deltas[lag:])
+    return deltas
+
+
+def window_features(data_stream, n_lags=0, window_size=None, stats=('mean', 'std'), delta_lag=None):
+    """
+    Builds a detector input from a data stream and its sliding-window features.
+
+    With only lags requested, the zero-copy view of lag_features is returned as is; otherwise the requested blocks
+    are stacked into a new matrix.
+
+    :param data_stream: Array-like object of shape (n_samples,) or (n_samples, n_features).
+    :param n_lags: The number of previous samples added to each row (default is 0).
+    :param window_size: The window of the rolling statistics, or None to skip them (default is None).
+    :param stats: The rolling statistics to compute (default is ('mean', 'std')).
+    :param delta_lag: The lag of the delta features, or None to skip them (default is None).
+    :return: A NumPy array of shape (n_samples, n_columns), starting with the current sample and its lags.
+    """
+    blocks = [lag_features(data_stream, n_lags)]
+    if window_size is not None:
+        blocks.append(rolling_features(data_stream, window_size, stats))
+    if delta_lag is not None:
+        blocks.append(delta_features(data_stream, delta_lag))
+    return blocks[0] if len(blocks) == 1 else np.hstack(blocks)
@@ -0,0 +1,164 @@
+import numpy as np
+
+from features import as_samples
+
+
+def _average_path_length(n_samples):
+    """
+    Computes the average path length of an unsuccessful search in a binary search tree of n_samples nodes.
+
+    This is the normalization used by Isolation Forest for leaves holding several training samples.
+
+    :param n_samples: NumPy array of sample counts.
+    :return: A float NumPy array of average path lengths.
+    """
+    n_samples = np.asarray(n_samples, dtype=float)
+    average_path_length = np.zeros_like(n_samples)
+    average_path_length[n_samples == 2] = 1.0
+    mask = n_samples > 2
+    average_path_length[mask] = (2.0 * (np.log(n_samples[mask] - 1.0) + np.euler_gamma)
+                                 - 2.0 * (n_samples[mask] - 1.0) / n_samples[mask])
+    return average_path_length
+
+
+class FlatIsolationForest:
+    """
+    An array-backed copy of a fitted scikit-learn IsolationForest for low-latency scoring.
+
+    All the trees are flattened into contiguous NumPy arrays (feature, threshold, children and leaf path length per
+    node). Leaves point to themselves, so a batch is scored by advancing every (tree, sample) pair one level at a
+    time for ``max_depth`` steps, without input validation, per-tree Python dispatch or thread pools. Scores and
+    decisions are the same as those of the original model.
+    """
+
+    def __init__(self, feature, threshold, left, right, leaf_value, roots, max_depth, n_features,
+                 average_path_length_max_samples, offset):
+        """
+        Initializes the FlatIsolationForest from its arrays; use from_sklearn to export a fitted model.
+
+        :param feature: Feature index tested at each node.
+        :param threshold: Split threshold of each node.
+        :param left: Index of the left child of each node (the node itself for leaves).
+        :param right: Index of the right child of each node (the node itself for leaves).
+        :param leaf_value: Path length contribution of each leaf (0 for internal nodes).
+        :param roots: Index of the root node of each tree.
+        :param max_depth: The maximum depth over all trees.
+        :param n_features: The number of features of the input.
+        :param average_path_length_max_samples: The path length normalization of the forest.
+        :param offset: The decision threshold of the forest (offset_ in scikit-learn).
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.leaf_value = leaf_value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features = n_features
+        self.average_path_length_max_samples = average_path_length_max_samples
+        self.offset = offset
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """
+        Exports a fitted scikit-learn IsolationForest.
+
+        :param model: A fitted IsolationForest.
+        :return: A FlatIsolationForest.
+        """
+        features, thresholds, lefts, rights, leaf_values, roots = [], [], [], [], [], []
+        node_offset = 0
+        for estimator, estimator_features in zip(model.estimators_, model.estimators_features_):
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            internal = nodes[~is_leaf]
+
+            # Node depths, propagated one level per pass from the root (root depth 1, as in scikit-learn)
+            depth = np.ones(tree.node_count)
+            for _ in range(tree.max_depth):
+                depth[tree.children_left[internal]] = depth[internal] + 1
+                depth[tree.children_right[internal]] = depth[internal] + 1
+
+            # Same arithmetic as IsolationForest so the scores match bit for bit
+            leaf_value = np.where(is_leaf, depth + _average_path_length(tree.n_node_samples) - 1.0, 0.0)
+
+            features.append(np.asarray(estimator_features)[np.where(is_leaf, 0, tree.feature)])
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, nodes, tree.children_left) + node_offset)
+            rights.append(np.where(is_leaf, nodes, tree.children_right) + node_offset)
+            leaf_values.append(leaf_value)
+            roots.append(node_offset)
+            node_offset += tree.node_count
+
+        return cls(feature=np.concatenate(features).astype(np.intp),
+                   threshold=np.concatenate(thresholds),
+                   left=np.concatenate(lefts).astype(np.intp),
+                   right=np.concatenate(rights).astype(np.intp),
+                   leaf_value=np.concatenate(leaf_values),
+                   roots=np.array(roots, dtype=np.intp),
+                   max_depth=max(estimator.tree_.max_depth for estimator in model.estimators_),
+                   n_features=model.n_features_in_,
+                   average_path_length_max_samples=float(_average_path_length([model.max_samples_])[0]),
+                   offset=model.offset_)
+
+    def _path_lengths(self, X, chunk_size):
+        """
+        Computes the summed path length of every sample over all trees.
+
+        :param X: NumPy array of shape (n_samples, n_features).
+        :param chunk_size: The number of samples traversed together.
+        :return: A NumPy array of summed path lengths.
+        """
+        path_lengths = np.empty(len(X))
+        for start in range(0, len(X), chunk_size):
+            # The trees compare float32 inputs, like scikit-learn does; casting per chunk keeps strided feature views
+            # (e.g. lag_features) from being materialized as a whole
+            X_chunk = X[start:start + chunk_size].astype(np.float32, copy=False)
+            rows = np.arange(len(X_chunk))
+            nodes = np.repeat(self.roots[:, np.newaxis], len(X_chunk), axis=1)
+            for _ in range(self.max_depth):
+                if self.n_features == 1:
+                    values = X_chunk[:, 0]
+                else:
+                    values = X_chunk[rows, self.feature[nodes]]
+                nodes = np.where(values <= self.threshold[nodes], self.left[nodes], self.right[nodes])
+            # Summing over axis 0 accumulates tree by tree, in the same order as scikit-learn
+            path_lengths[start:start + chunk_size] = self.leaf_value[nodes].sum(axis=0)
+        return path_lengths
+
+    def score_samples(self, data_stream, chunk_size=4096):
+        """
+        Computes the Isolation Forest score of each point (the lower, the more abnormal).
+
+        :param data_stream: Array-like object representing the data stream.
+        :param chunk_size: The number of points traversed together, bounding memory (default is 4096).
+        :return: A NumPy array of scores, equal to IsolationForest.score_samples.
+        :raises ValueError: If the points do not have the number of features the forest was fitted on.
+        """
+        X = as_samples(data_stream, self.n_features)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected points of {self.n_features} features, got {X.shape[1]}.")
+        denominator = len(self.roots) * self.average_path_length_max_samples
+        # A forest fitted on a single sample scores every point -0.5, as scikit-learn does
+        if denominator == 0:
+            return np.full(len(X), -0.5)
+        return -(2 ** (-np.divide(self._path_lengths(X, chunk_size), denominator)))
+
+    def decision_function(self, data_stream):
+        """
+        Computes the decision value of each point; negative values indicate anomalies.
+
+        :param data_stream: Array-like object representing the data stream.
+        :return: A NumPy array of decision values, equal to IsolationForest.decision_function.
+        """
+        return self.score_samples(data_stream) - self.offset
+
+    def predict(self, data_stream):
+        """
+        Predicts anomalies in the provided data stream.
+
+        :param data_stream: Array-like object representing the data stream.
+        :return: A NumPy array of indices where anomalies were detected.
+        """
+        return np.where(self.decision_function(data_stream) < 0)[0]
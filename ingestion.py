@@ -0,0 +1,187 @@
+import argparse
+
+import numpy as np
+
+from anomaly_detector import StreamingIsolationForestAnomalyDetector
+from data_scaler import StreamingScaler
+from drift_detector import OnlineDriftDetector
+from features import as_series
+import instrumentation
+
+
+def open_stream(path, dtype=np.float64, offset=0, n_features=1):
+    """
+    Opens an on-disk data stream as a read-only memory map, without loading it into RAM.
+
+    ``.npy`` files carry their own dtype and shape, one row per point for multivariate streams; any other file is
+    read as raw binary values of ``dtype``, ``n_features`` consecutive values per point.
+
+    :param path: Path of the ``.npy`` or raw binary file.
+    :param dtype: The dtype of raw binary files (default is float64).
+    :param offset: The number of header bytes to skip in raw binary files (default is 0).
+    :param n_features: The number of values per point in raw binary files (default is 1).
+    :return: A memory-mapped NumPy array of shape (n_samples,) or (n_samples, n_features).
+    :raises ValueError: If the file contains no values, or a raw file does not hold a whole number of points.
+    """
+    if str(path).endswith('.npy'):
+        data_stream = np.load(path, mmap_mode='r')
+    else:
+        data_stream = np.memmap(path, dtype=dtype, mode='r', offset=offset)
+        if data_stream.size % n_features:
+            raise ValueError(f"The file does not hold a whole number of points of {n_features} values.")
+        data_stream = data_stream.reshape(-1, n_features)
+
+    if data_stream.size == 0:
+        raise ValueError("The data stream is empty.")
+    return as_series(data_stream)
+
+
+def iter_chunks(data_stream, chunk_size=100_000):
+    """
+    Yields fixed-size chunks of a data stream as zero-copy views.
+
+    :param data_stream: (Possibly memory-mapped) NumPy array, one value or one row of features per point.
+    :param chunk_size: The number of points per chunk; the last chunk may be shorter (default is 100000).
+    :return: A generator of (start index, chunk) tuples.
+    :raises ValueError: If the chunk size is not positive.
+    """
+    if chunk_size < 1:
+        raise ValueError("The chunk size must be positive.")
+
+    for start in range(0, len(data_stream), chunk_size):
+        yield start, data_stream[start:start + chunk_size]
+
+
+def fit_scaler(chunks, dtype=np.float64):
+    """
+    Fits a StreamingScaler over all chunks in a single streaming pass.
+
+    :param chunks: Iterable of (start index, chunk) tuples.
+    :param dtype: The dtype of the scaled output (default is float64).
+    :return: The fitted StreamingScaler.
+    """
+    scaler = StreamingScaler(dtype=dtype)
+    for _, chunk in chunks:
+        scaler.partial_fit(chunk)
+    return scaler
+
+
+def detect_chunks(chunks, scaler, detector, drift_detector):
+    """
+    Runs the detection pipeline chunk by chunk: scaling, drift detection and anomaly detection.
+
+    The detector is incrementally retrained on every chunk before scoring it, so memory stays bounded by the
+    detector's ring buffer regardless of the stream length.
+
+    :param chunks: Iterable of (start index, chunk) tuples.
+    :param scaler: A fitted StreamingScaler.
+    :param detector: A StreamingIsolationForestAnomalyDetector.
+    :param drift_detector: An OnlineDriftDetector.
+    :return: A generator of (start index, anomaly indices, drift indices) tuples with global stream indices.
+    """
+    for start, chunk in chunks:
+        chunk_scaled = scaler.transform(chunk)
+        drift_points = drift_detector.update(chunk)
+
+        detector.partial_fit(chunk_scaled)
+        anomalies = detector.predict(chunk_scaled) + start
+
+        instrumentation.increment('points_processed', len(chunk))
+        instrumentation.increment('anomalies', len(anomalies))
+        instrumentation.increment('drift_events', len(drift_points))
+        instrumentation.increment('retrains')
+        yield start, anomalies, drift_points
+
+
+class IndexWriter:
+    """
+    Appends indices to a raw int64 binary file as they are produced.
+
+    The output can be read back with ``np.fromfile(path, dtype=np.int64)`` or memory-mapped with open_stream.
+    """
+
+    def __init__(self, path):
+        """
+        Opens (and truncates) the output file.
+
+        :param path: Destination file path.
+        """
+        self.path = path
+        self.count = 0
+        self._file = open(path, 'wb')
+
+    def write(self, indices):
+        """
+        Appends a batch of indices to the file.
+
+        :param indices: Array-like object of indices.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        indices.tofile(self._file)
+        self.count += indices.size
+
+    def close(self):
+        """
+        Flushes and closes the output file.
+        """
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def run_file_pipeline(input_path, output_path, chunk_size=100_000, dtype=np.float64, contamination=0.05,
+                      n_estimators=100, buffer_size=None, trees_per_update=10, window_size=50, drift_threshold=0.2,
+                      n_features=1):
+    """
+    Runs the anomaly detection flow of main.py over an on-disk stream without loading it into memory.
+
+    The stream is read twice through a memory map: once to fit the scaler, once to detect anomalies, which are
+    written to ``output_path`` incrementally.
+
+    :param input_path: Path of the ``.npy`` or raw binary input stream.
+    :param output_path: Path of the raw int64 file receiving the anomaly indices.
+    :param chunk_size: The number of points per chunk (default is 100000).
+    :param dtype: The dtype of raw binary input files (default is float64).
+    :param contamination: The proportion of outliers in the data (default is 0.05).
+    :param n_estimators: The number of trees in the forest (default is 100).
+    :param buffer_size: The number of recent points the detector is trained on (default is chunk_size).
+    :param trees_per_update: The number of trees replaced on each chunk (default is 10).
+    :param window_size: The window size of the drift detector (default is 50).
+    :param drift_threshold: The threshold of the drift detector (default is 0.2).
+    :param n_features: The number of values per point in raw binary input files (default is 1).
+    :return: A tuple with the number of points processed, anomalies written and drift points detected.
+    """
+    data_stream = open_stream(input_path, dtype=dtype, n_features=n_features)
+    scaler = fit_scaler(iter_chunks(data_stream, chunk_size))
+    detector = StreamingIsolationForestAnomalyDetector(contamination=contamination, n_estimators=n_estimators,
+                                                       buffer_size=buffer_size or chunk_size,
+                                                       trees_per_update=trees_per_update)
+    drift_detector = OnlineDriftDetector(window_size=window_size, drift_threshold=drift_threshold)
+
+    n_drift_points = 0
+    with IndexWriter(output_path) as writer:
+        for _, anomalies, drift_points in detect_chunks(iter_chunks(data_stream, chunk_size), scaler, detector,
+                                                        drift_detector):
+            writer.write(anomalies)
+            n_drift_points += len(drift_points)
+
+    return len(data_stream), writer.count, n_drift_points
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detect anomalies in an on-disk data stream chunk by chunk.")
+    parser.add_argument('input_path', help="The .npy or raw binary file holding the data stream.")
+    parser.add_argument('output_path', help="The raw int64 file receiving the anomaly indices.")
+    parser.add_argument('--chunk-size', type=int, default=100_000, help="The number of points per chunk.")
+    parser.add_argument('--dtype', default='float64', help="The dtype of raw binary input files.")
+    parser.add_argument('--n-features', type=int, default=1, help="The number of values per point in raw files.")
+    args = parser.parse_args()
+
+    n_points, n_anomalies, n_drift_points = run_file_pipeline(args.input_path, args.output_path,
+                                                              chunk_size=args.chunk_size, dtype=args.dtype,
+                                                              n_features=args.n_features)
+    print(f'Points: {n_points}, Anomalies: {n_anomalies}, Drift Points: {n_drift_points}')
@@ -0,0 +1,218 @@
+import cProfile
+import functools
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+# Instrumentation is toggled with the ANOMALY_INSTRUMENTATION environment variable (or enable()); profilers are
+# selected with ANOMALY_PROFILE, a comma-separated list of 'cprofile' and 'tracemalloc'.
+_enabled = False
+_lock = threading.Lock()
+_timers = {}  # Stage name -> [calls, total seconds, max seconds]
+_counters = {}
+_profiler = None
+_memory_peak = None  # Peak traced memory in bytes, kept after tracemalloc is stopped
+
+
+class _Stage:
+    """
+    Context manager that times a pipeline stage while instrumentation is enabled.
+    """
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.start
+        with _lock:
+            timer = _timers.setdefault(self.name, [0, 0.0, 0.0])
+            timer[0] += 1
+            timer[1] += elapsed
+            timer[2] = max(timer[2], elapsed)
+
+
+class _NullStage:
+    """
+    Shared no-op context manager returned while instrumentation is disabled.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return None
+
+
+_NULL_STAGE = _NullStage()
+
+
+def enable(profile=()):
+    """
+    Enables the stage timers and counters, and optionally the profilers.
+
+    :param profile: Iterable of profilers to start: 'cprofile' and/or 'tracemalloc' (default is none).
+    :raises ValueError: If an unknown profiler is requested.
+    """
+    global _enabled, _profiler
+    unknown = set(profile) - {'cprofile', 'tracemalloc'}
+    if unknown:
+        raise ValueError(f"Unknown profilers: {', '.join(sorted(unknown))}.")
+
+    _enabled = True
+    if 'cprofile' in profile and _profiler is None:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    if 'tracemalloc' in profile and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    """
+    Disables instrumentation and stops any running profiler. Collected metrics are kept until reset().
+    """
+    global _enabled, _memory_peak
+    _enabled = False
+    if _profiler is not None:
+        _profiler.disable()
+    if tracemalloc.is_tracing():
+        _memory_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+
+def is_enabled():
+    """
+    Returns whether instrumentation is currently enabled.
+    """
+    return _enabled
+
+
+def reset():
+    """
+    Clears all the collected timers, counters and profiling data.
+    """
+    global _profiler, _memory_peak
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+    _memory_peak = None
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler = None
+        if _enabled:
+            _profiler = cProfile.Profile()
+            _profiler.enable()
+
+
+def stage(name):
+    """
+    Returns a context manager timing a pipeline stage; a shared no-op object while disabled.
+
+    :param name: The name of the stage.
+    :return: A context manager.
+    """
+    return _Stage(name) if _enabled else _NULL_STAGE
+
+
+def timed(name):
+    """
+    Decorator timing every call of a function as a pipeline stage.
+
+    While instrumentation is disabled the wrapper only checks a flag before calling the function.
+
+    :param name: The name of the stage.
+    :return: The decorator.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def increment(name, amount=1):
+    """
+    Increments a counter (e.g. points processed, anomalies, drift events, retrains) while enabled.
+
+    :param name: The name of the counter.
+    :param amount: The amount to add (default is 1).
+    """
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def snapshot(top=20):
+    """
+    Returns a JSON-serializable snapshot of the collected metrics.
+
+    :param top: The number of functions with the highest cumulative time included from cProfile (default is 20).
+    :return: A dictionary with the 'stages', 'counters' and, when profiling, 'profile' and 'memory' sections.
+    """
+    with _lock:
+        result = {
+            'stages': {name: {'calls': calls, 'total_seconds': total, 'max_seconds': longest,
+                              'mean_seconds': total / calls}
+                       for name, (calls, total, longest) in _timers.items()},
+            'counters': dict(_counters),
+        }
+
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        result['memory'] = {'current_bytes': current, 'peak_bytes': peak}
+    elif _memory_peak is not None:
+        result['memory'] = {'peak_bytes': _memory_peak}
+
+    if _profiler is not None:
+        stats = pstats.Stats(_profiler)
+        result['profile'] = [
+            {'function': f'{path}:{line}({function})', 'calls': calls, 'total_seconds': total_time,
+             'cumulative_seconds': cumulative_time}
+            for (path, line, function), (_, calls, total_time, cumulative_time, _) in
+            sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+        ]
+    return result
+
+
+def export(path):
+    """
+    Writes the metrics snapshot to a JSON file.
+
+    :param path: Destination file path.
+    """
+    with open(path, 'w') as output_file:
+        json.dump(snapshot(), output_file, indent=2)
+
+
+def dump_profile(path):
+    """
+    Writes the raw cProfile statistics to a file readable with pstats or snakeviz.
+
+    :param path: Destination file path.
+    :raises ValueError: If cProfile is not running.
+    """
+    if _profiler is None:
+        raise ValueError("cProfile is not enabled.")
+    _profiler.dump_stats(path)
+
+
+if os.environ.get('ANOMALY_INSTRUMENTATION', '0') not in ('', '0'):
+    enable([name.strip() for name in os.environ.get('ANOMALY_PROFILE', '').split(',') if name.strip()])
@@ -1,42 +1,65 @@
-from anomaly_detector import IsolationForestAnomalyDetector
 from data_generator import generate_advanced_data_stream
 from data_scaler import scale_data
-from drift_detector import detect_simple_drift
+from decomposition import SeasonalDecomposer
+from drift_detector import debounce_drift_points, detect_simple_drift
+from model_cache import ModelCache
 from plotter import plot_real_time
 from utils import log_error, calculate_metrics
+import instrumentation
 import logging
+import os
+
+# Detect anomalies on the residual left after removing trend and seasonality, which needs fewer trees
+use_decomposition = True
 
 if __name__ == "__main__":
     try:
-        # Generate a data stream with predefined parameters such as noise level, trend factor, and seasonality
+        seasonality_period = 150
+
+        # Generate a data stream with predefined parameters such as noise level, trend factor, and seasonality; the
+        # fixed seed makes reruns see the same stream, so the model cache below can reuse the trained forest
         data_stream, true_anomalies = generate_advanced_data_stream(
             num_points=1000,
             noise_level=0.05,
             trend_factor=0.001,
-            seasonality_period=150,
+            seasonality_period=seasonality_period,
             anomaly_freq=0.04,
-            anomaly_magnitude=4
+            anomaly_magnitude=4,
+            random_state=42
         )
 
         # Detect drift points in the data stream using a simple drift detection method
         drift_points = detect_simple_drift(data_stream)
 
+        # Collapse bursts of adjacent drift points so each drift triggers a single retrain
+        retrain_points = debounce_drift_points(drift_points, cooldown=100, stream_length=len(data_stream))
+
+        # Optionally remove the trend and the seasonal profile so the forest only models the residual
+        detector_input, n_estimators = data_stream, 200
+        if use_decomposition:
+            decomposer = SeasonalDecomposer(seasonality_period).fit_profile(data_stream)
+            detector_input, n_estimators = decomposer.transform(data_stream), 50
+
         # Scale the data stream using StandardScaler for better anomaly detection performance
-        data_stream_scaled = scale_data(data_stream)
+        data_stream_scaled = scale_data(detector_input)
 
-        # Initialize the Isolation Forest anomaly detector
-        detector = IsolationForestAnomalyDetector(contamination=0.05, n_estimators=200)
+        # Fit the Isolation Forest model to the pre-drift segment, reusing a cached forest if it was already trained
+        first_segment_end = retrain_points[0] if len(retrain_points) > 0 else len(data_stream_scaled)
+        detector = ModelCache('.model_cache').get_or_fit('main', data_stream_scaled[:first_segment_end],
+                                                         contamination=0.05, n_estimators=n_estimators)
 
-        # Fit the Isolation Forest model to the scaled data stream
-        detector.fit(data_stream_scaled)
+        # If drift points are detected, log the event; the model is retrained only on each post-drift segment
+        if len(retrain_points) > 0:
+            logging.info(f"Drift detected, retraining the model on {len(retrain_points)} post-drift segments...")
 
-        # Predict anomalies in the data stream
-        if_anomalies = detector.predict(data_stream_scaled)
+        # Predict anomalies in each segment with the model valid for it
+        if_anomalies = detector.predict_segments(data_stream_scaled, retrain_points)
 
-        # If drift points are detected, log the event and update the model accordingly
-        if len(drift_points) > 0:
-            logging.info("Drift detected, updating the model...")
-            detector.update_model(data_stream_scaled)
+        # Record the pipeline counters (no-ops unless ANOMALY_INSTRUMENTATION is set)
+        instrumentation.increment('points_processed', len(data_stream))
+        instrumentation.increment('anomalies', len(if_anomalies))
+        instrumentation.increment('drift_events', len(drift_points))
+        instrumentation.increment('retrains', len(retrain_points))
 
         # Visualize the real-time data stream along with detected anomalies and drift points
         plot_real_time(
@@ -57,3 +80,7 @@ tp, fp, fn = calculate_metrics(if_anomalies, true_anomalies)
 
 # Print the calculated metrics for the model's performance
 print(f'True Positives: {tp}, False Positives: {fp}, False Negatives: {fn}')
+
+# Export the stage timers, counters and profiles when instrumentation is enabled
+if instrumentation.is_enabled():
+    instrumentation.export(os.environ.get('ANOMALY_METRICS_PATH', 'instrumentation.json'))
@@ -0,0 +1,132 @@
+from collections import OrderedDict
+import hashlib
+import os
+
+import numpy as np
+
+from anomaly_detector import IsolationForestAnomalyDetector
+
+
+def fingerprint(data_stream, **config):
+    """
+    Computes a stable fingerprint of a data stream and the configuration used to train on it.
+
+    :param data_stream: Array-like object representing the data stream.
+    :param config: Model parameters that affect training (e.g. contamination, n_estimators).
+    :return: A hexadecimal digest string.
+    """
+    data_stream = np.ascontiguousarray(data_stream)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(data_stream.dtype.str.encode())
+    digest.update(str(data_stream.shape).encode())
+    digest.update(data_stream.data)
+    digest.update(repr(sorted(config.items())).encode())
+    return digest.hexdigest()
+
+
+class ModelCache:
+    """
+    A keyed cache of trained IsolationForestAnomalyDetector models with least-recently-used eviction.
+
+    Models are keyed by series id plus a fingerprint of the training data and configuration, kept in memory and
+    persisted to a directory, so restarts and repeated runs reuse already trained forests instead of refitting.
+    The recency order survives restarts through the modification time of the cached files.
+    """
+
+    def __init__(self, directory, max_entries=32):
+        """
+        Initializes the cache and indexes the models already stored in the directory.
+
+        :param directory: Directory where the models are stored (created if missing).
+        :param max_entries: The maximum number of models kept; the least recently used are evicted (default is 32).
+        :raises ValueError: If max_entries is not positive.
+        """
+        if max_entries < 1:
+            raise ValueError("The cache must hold at least one model.")
+
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+        # Maps file names to loaded detectors (None until loaded), least recently used first
+        self._entries = OrderedDict()
+        paths = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.joblib')]
+        for path in sorted(paths, key=os.path.getmtime):
+            self._entries[os.path.basename(path)] = None
+        self._evict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _file_name(series_id, data_fingerprint):
+        """
+        Builds a file-system safe name for a cache key.
+        """
+        key = hashlib.blake2b(f'{series_id}\0{data_fingerprint}'.encode(), digest_size=16).hexdigest()
+        return f'{key}.joblib'
+
+    def _evict(self):
+        """
+        Removes the least recently used models until the cache fits in max_entries.
+        """
+        while len(self._entries) > self.max_entries:
+            name, _ = self._entries.popitem(last=False)
+            path = os.path.join(self.directory, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def get(self, series_id, data_fingerprint):
+        """
+        Returns the cached detector for a key, or None on a cache miss.
+
+        :param series_id: Identifier of the series the model was trained on.
+        :param data_fingerprint: Fingerprint of the training data and configuration.
+        :return: The cached IsolationForestAnomalyDetector, or None.
+        """
+        name = self._file_name(series_id, data_fingerprint)
+        if name not in self._entries:
+            return None
+
+        path = os.path.join(self.directory, name)
+        detector = self._entries[name]
+        if detector is None:
+            detector = IsolationForestAnomalyDetector.load(path)
+            self._entries[name] = detector
+
+        # Mark the entry as most recently used, in memory and on disk
+        self._entries.move_to_end(name)
+        os.utime(path)
+        return detector
+
+    def put(self, series_id, data_fingerprint, detector):
+        """
+        Stores a fitted detector in the cache, evicting the least recently used models if needed.
+
+        :param series_id: Identifier of the series the model was trained on.
+        :param data_fingerprint: Fingerprint of the training data and configuration.
+        :param detector: A fitted IsolationForestAnomalyDetector.
+        """
+        name = self._file_name(series_id, data_fingerprint)
+        detector.save(os.path.join(self.directory, name))
+        self._entries[name] = detector
+        self._entries.move_to_end(name)
+        self._evict()
+
+    def get_or_fit(self, series_id, data_stream, contamination=0.05, n_estimators=100):
+        """
+        Returns a detector fitted on the data stream, reusing a cached one when available.
+
+        :param series_id: Identifier of the series.
+        :param data_stream: Array-like object representing the training data stream.
+        :param contamination: The proportion of outliers in the data (default is 0.05).
+        :param n_estimators: The number of trees in the forest (default is 100).
+        :return: A fitted IsolationForestAnomalyDetector.
+        """
+        data_fingerprint = fingerprint(data_stream, contamination=contamination, n_estimators=n_estimators)
+        detector = self.get(series_id, data_fingerprint)
+        if detector is None:
+            detector = IsolationForestAnomalyDetector(contamination=contamination, n_estimators=n_estimators)
+            detector.fit(data_stream)
+            self.put(series_id, data_fingerprint, detector)
+        return detector
@@ -1,9 +1,88 @@
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
 from matplotlib.patches import Patch
 import numpy as np
 import time
 
-def plot_real_time(data_stream, if_anomalies, drift_points, true_anomalies=None, update_interval=0.1, batch_size=50):
+from instrumentation import timed
+
+
+def _window_offsets(indices, data_stream, start, end):
+    """
+    Returns the (index, value) pairs of the sorted indices that fall inside [start, end).
+
+    :param indices: Sorted NumPy array of indices.
+    :param data_stream: The data stream values.
+    :param start: First index of the window.
+    :param end: End (exclusive) of the window.
+    :return: A NumPy array of shape (k, 2) ready for a scatter plot.
+    """
+    first, last = np.searchsorted(indices, [start, end])
+    selected = indices[first:last]
+    return np.column_stack((selected, data_stream[selected]))
+
+
+def _decimate(data_stream, start, end, x_buffer, y_buffer):
+    """
+    Writes the points of [start, end) into the preallocated buffers, using min/max decimation when they don't fit.
+
+    The window is split into at most ``len(x_buffer) // 2`` buckets and each bucket is drawn as its minimum and
+    maximum, which preserves the visual envelope of the signal (and its spikes) at a bounded number of points.
+
+    :param data_stream: The data stream values.
+    :param start: First index of the window.
+    :param end: End (exclusive) of the window.
+    :param x_buffer: Preallocated array receiving the x coordinates.
+    :param y_buffer: Preallocated array receiving the y coordinates.
+    :return: The number of points written into the buffers.
+    """
+    size = end - start
+    if size <= len(x_buffer):
+        x_buffer[:size] = np.arange(start, end)
+        y_buffer[:size] = data_stream[start:end]
+        return size
+
+    bucket = -(-size // (len(x_buffer) // 2))
+    n_full = size // bucket
+    full = data_stream[start:start + n_full * bucket].reshape(n_full, bucket)
+    centers = start + np.arange(n_full) * bucket + bucket / 2
+    x_buffer[0:2 * n_full:2] = centers
+    x_buffer[1:2 * n_full:2] = centers
+    y_buffer[0:2 * n_full:2] = full.min(axis=1)
+    y_buffer[1:2 * n_full:2] = full.max(axis=1)
+
+    count = 2 * n_full
+    if start + n_full * bucket < end:
+        # The last, partial bucket
+        tail = data_stream[start + n_full * bucket:end]
+        x_buffer[count:count + 2] = (start + n_full * bucket + end) / 2
+        y_buffer[count] = tail.min()
+        y_buffer[count + 1] = tail.max()
+        count += 2
+    return count
+
+
+def _set_window_limits(ax, data_stream, window_start, window_width):
+    """
+    Fixes the axes limits to a window of the stream, with y-limits covering every value the window will show.
+
+    :param ax: The matplotlib Axes.
+    :param data_stream: The data stream values.
+    :param window_start: First index of the window.
+    :param window_width: Number of data points in the window.
+    """
+    window = data_stream[window_start:window_start + window_width]
+    low, high = window.min(), window.max()
+    margin = 0.05 * (high - low) or 1.0
+    ax.set_xlim(window_start, window_start + window_width)
+    ax.set_ylim(low - margin, high + margin)
+
+
+@timed('plot')
+def plot_real_time(data_stream, if_anomalies, drift_points, true_anomalies=None, update_interval=0.1, batch_size=50,
+                   window_width=1000, max_points=2000, headless=False):
     """
     Plots a real-time graph of a data stream, highlighting detected anomalies and drift points.
 
@@ -11,32 +90,63 @@ def plot_real_time(data_stream, if_anomalies, drift_points, true_anomalies=None,
     the Isolation Forest model (if_anomalies), and any drift points identified. If true anomalies are
     provided, they will be displayed for comparison.
 
+    Only a fixed-width window of the stream is shown, decimated to at most ``max_points`` points, and every batch is
+    drawn with blitting on top of a cached background, so the cost of a frame does not grow with the stream length.
+    The background is only redrawn when the window scrolls.
+
     :param data_stream: Array-like object containing the data stream values.
     :param if_anomalies: Array of indices representing anomalies detected by the Isolation Forest model.
     :param drift_points: Array of indices representing detected drift points.
     :param true_anomalies: (Optional) Array of indices representing the true anomalies in the data stream.
     :param update_interval: Time in seconds between each update to simulate real-time behavior.
     :param batch_size: Number of data points to be processed and displayed per batch.
+    :param window_width: Number of data points visible at once; the window scrolls by half its width (default is 1000).
+    :param max_points: Maximum number of points drawn for the data stream line (default is 2000).
+    :param headless: If True, renders off-screen without waiting between batches and returns the figure.
+    :return: The matplotlib Figure.
     """
-    plt.ion()  # Activate interactive mode for real-time animation
-    fig, ax = plt.subplots(figsize=(10, 6))  # Define plot size for better visualization
+    data_stream = np.asarray(data_stream, dtype=float).ravel()
+    if_anomalies = np.sort(np.asarray(if_anomalies, dtype=int))
+    drift_points = np.sort(np.asarray(drift_points, dtype=int))
+    if true_anomalies is not None:
+        true_anomalies = np.sort(np.asarray(true_anomalies, dtype=int))
+
+    if headless:
+        # Off-screen Agg canvas, independent of the pyplot state
+        fig = Figure(figsize=(10, 6))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+    else:
+        plt.ion()  # Activate interactive mode for real-time animation
+        fig, ax = plt.subplots(figsize=(10, 6))  # Define plot size for better visualization
 
-    # Initialize empty lists to store data for real-time plotting
-    x_data, y_data = [], []
-    anomaly_x, anomaly_y = [], []
-    drift_x, drift_y = [], []
-    true_anomaly_x, true_anomaly_y = [], []
+    # The limits cover the whole window ahead, so only scrolling requires redrawing the background
+    _set_window_limits(ax, data_stream, 0, window_width)
 
-    # Main line plot for the data stream
-    line, = ax.plot(x_data, y_data, label='Data Stream', lw=2, color='navy')
+    # Preallocated buffers for the (decimated) data stream line
+    line_x = np.empty(max(max_points, 2))
+    line_y = np.empty(max(max_points, 2))
+
+    # Main line plot for the data stream; every dynamic artist is animated so it is drawn only when blitting
+    line, = ax.plot([], [], label='Data Stream', lw=2, color='navy', animated=True)
 
     # Scatter plot for anomalies and drift points
-    anomaly_scatter = ax.scatter(anomaly_x, anomaly_y, color='red', label='IF Anomalies', s=50, alpha=0.9, edgecolor='k', zorder=3, marker='o')
-    drift_scatter = ax.scatter(drift_x, drift_y, color='orange', label='Drift Points', s=50, alpha=0.5, edgecolor='k', zorder=1)
+    anomaly_scatter = ax.scatter([], [], color='red', label='IF Anomalies', s=50, alpha=0.9, edgecolor='k', zorder=3,
+                                 marker='o', animated=True)
+    drift_scatter = ax.scatter([], [], color='orange', label='Drift Points', s=50, alpha=0.5, edgecolor='k', zorder=1,
+                               animated=True)
+
+    # A single collection holds the semi-transparent patches highlighting drift areas
+    drift_spans = PolyCollection([], facecolor='orange', edgecolor='none', alpha=0.2, zorder=0, animated=True)
+    ax.add_collection(drift_spans)
+
+    artists = [drift_spans, line, drift_scatter, anomaly_scatter]
 
     # Scatter plot for true anomalies (if provided)
     if true_anomalies is not None:
-        true_anomaly_scatter = ax.scatter(true_anomaly_x, true_anomaly_y, color='blue', label='True Anomalies', s=70, alpha=0.7, edgecolor='k', zorder=2, marker='^')
+        true_anomaly_scatter = ax.scatter([], [], color='blue', label='True Anomalies', s=70, alpha=0.7,
+                                          edgecolor='k', zorder=2, marker='^', animated=True)
+        artists.append(true_anomaly_scatter)
 
     # Setting up the title and labels for the plot
     ax.set_title('Real-Time Data Stream with Anomaly and Drift Detection', fontsize=16, fontweight='bold', color='darkblue')
@@ -54,45 +164,60 @@ def plot_real_time(data_stream, if_anomalies, drift_points, true_anomalies=None,
 
     # Real-time statistics box for displaying mean, standard deviation, min, and max of the current batch
     stats_box = ax.text(0.02, 0.95, '', transform=ax.transAxes, fontsize=12, verticalalignment='top',
-                        bbox=dict(boxstyle='round,pad=0.3', edgecolor='black', facecolor='lightgrey', alpha=0.7))
+                        bbox=dict(boxstyle='round,pad=0.3', edgecolor='black', facecolor='lightgrey', alpha=0.7),
+                        animated=True)
+    artists.append(stats_box)
+
+    # Backends without blitting support redraw the whole figure, with the dynamic artists drawn as regular ones
+    use_blit = fig.canvas.supports_blit
+    if not use_blit:
+        for artist in artists:
+            artist.set_animated(False)
+
+    # Cache the static background after every full draw (initial draw, scrolling or window resize)
+    background = {}
+
+    def capture_background(event=None):
+        background['image'] = fig.canvas.copy_from_bbox(ax.bbox)
+
+    if use_blit:
+        fig.canvas.mpl_connect('draw_event', capture_background)
+    fig.canvas.draw()
+
+    window_start = 0
 
     # Loop for processing and visualizing data in real-time
     for i in range(0, len(data_stream), batch_size):
-        new_data_batch = data_stream[i:i + batch_size]
-        new_indices = list(range(i, i + batch_size))
-
-        # Update data for the main line plot
-        x_data.extend(new_indices)
-        y_data.extend(new_data_batch)
-
-        line.set_xdata(x_data)
-        line.set_ydata(y_data)
-
-        # Update anomalies detected by Isolation Forest
-        new_anomalies = if_anomalies[(if_anomalies >= i) & (if_anomalies < i + batch_size)]
-        if new_anomalies.size > 0:
-            anomaly_x.extend(new_anomalies)
-            anomaly_y.extend(data_stream[new_anomalies])
-            anomaly_scatter.set_offsets(np.c_[anomaly_x, anomaly_y])
-
-        # Update detected drift points
-        new_drift = drift_points[(drift_points >= i) & (drift_points < i + batch_size)]
-        if new_drift.size > 0:
-            drift_x.extend(new_drift)
-            drift_y.extend(data_stream[new_drift])
-            drift_scatter.set_offsets(np.c_[drift_x, drift_y])
-
-            # Add a semi-transparent patch to highlight drift areas
-            for drift_point in new_drift:
-                ax.axvspan(drift_point - batch_size, drift_point + batch_size, color='orange', alpha=0.2, zorder=0)
+        end = min(i + batch_size, len(data_stream))
+        new_data_batch = data_stream[i:end]
+
+        # Scroll the window by half its width once the data reaches its right edge
+        if end > window_start + window_width:
+            window_start = end - window_width // 2
+            _set_window_limits(ax, data_stream, window_start, window_width)
+            fig.canvas.draw()
+
+        # Update the (decimated) data for the main line plot
+        count = _decimate(data_stream, window_start, end, line_x, line_y)
+        line.set_data(line_x[:count], line_y[:count])
+
+        # Update anomalies detected by Isolation Forest and drift points visible in the window
+        anomaly_scatter.set_offsets(_window_offsets(if_anomalies, data_stream, window_start, end))
+        drift_offsets = _window_offsets(drift_points, data_stream, window_start - batch_size, end)
+        drift_scatter.set_offsets(drift_offsets)
+
+        # Update the drift area patches
+        left = drift_offsets[:, 0] - batch_size
+        right = drift_offsets[:, 0] + batch_size
+        bottom, top = ax.get_ylim()
+        drift_spans.set_verts(np.stack([np.column_stack((left, np.full_like(left, bottom))),
+                                        np.column_stack((right, np.full_like(right, bottom))),
+                                        np.column_stack((right, np.full_like(right, top))),
+                                        np.column_stack((left, np.full_like(left, top)))], axis=1))
 
         # Update true anomalies (if provided)
         if true_anomalies is not None:
-            new_true_anomalies = true_anomalies[(true_anomalies >= i) & (true_anomalies < i + batch_size)]
-            if new_true_anomalies.size > 0:
-                true_anomaly_x.extend(new_true_anomalies)
-                true_anomaly_y.extend(data_stream[new_true_anomalies])
-                true_anomaly_scatter.set_offsets(np.c_[true_anomaly_x, true_anomaly_y])
+            true_anomaly_scatter.set_offsets(_window_offsets(true_anomalies, data_stream, window_start, end))
 
         # Update real-time statistics box
         mean_value = np.mean(new_data_batch)
@@ -101,17 +226,26 @@ def plot_real_time(data_stream, if_anomalies, drift_points, true_anomalies=None,
         max_value = np.max(new_data_batch)
         stats_box.set_text(f'Mean: {mean_value:.2f}\nStd: {std_value:.2f}\nMin: {min_value:.2f}\nMax: {max_value:.2f}')
 
-        # Dynamically adjust axes for new data
-        ax.relim()
-        ax.autoscale_view()
-
-        # Redraw the figure and update the UI in real-time
-        fig.canvas.draw()
+        if use_blit:
+            # Blit the dynamic artists on top of the cached background
+            fig.canvas.restore_region(background['image'])
+            for artist in artists:
+                ax.draw_artist(artist)
+            fig.canvas.blit(ax.bbox)
+        else:
+            fig.canvas.draw_idle()
         fig.canvas.flush_events()
 
         # Pause to simulate real-time updates
-        time.sleep(update_interval)
-
-    # Disable interactive mode after the loop is complete
-    plt.ioff()
-    plt.show()
+        if not headless:
+            time.sleep(update_interval)
+
+    # Turn the dynamic artists into regular ones so the final figure (and any saved image) shows them
+    for artist in artists:
+        artist.set_animated(False)
+
+    if not headless:
+        # Disable interactive mode after the loop is complete
+        plt.ioff()
+        plt.show()
+    return fig
@@ -0,0 +1,322 @@
+import argparse
+import asyncio
+from collections import deque
+import json
+import logging
+import sys
+import time
+
+import numpy as np
+
+from anomaly_detector import IsolationForestAnomalyDetector
+from data_generator import generate_advanced_data_stream
+from data_scaler import StreamingScaler
+from utils import log_error
+
+
+class MicroBatchScorer:
+    """
+    Groups live points into micro-batches and scores them with a fitted scaler and Isolation Forest detector.
+
+    A batch is closed as soon as it holds ``max_batch_size`` points or its first point has waited ``max_latency``
+    seconds. Points are buffered in a bounded queue, so producers are slowed down (backpressure) when scoring
+    cannot keep up. The latency of every point, from arrival to scoring, is tracked over a sliding window.
+    """
+
+    def __init__(self, detector, scaler, max_batch_size=256, max_latency=0.01, queue_size=4096,
+                 latency_window=10_000):
+        """
+        Initializes the MicroBatchScorer.
+
+        :param detector: A fitted IsolationForestAnomalyDetector.
+        :param scaler: A fitted StreamingScaler.
+        :param max_batch_size: The maximum number of points scored together (default is 256).
+        :param max_latency: The maximum time in seconds a point waits for its batch to fill (default is 0.01).
+        :param queue_size: The maximum number of points waiting to be scored (default is 4096).
+        :param latency_window: The number of recent point latencies kept for the report (default is 10000).
+        :raises ValueError: If the batch size or the latency deadline is not positive.
+        """
+        if max_batch_size < 1 or max_latency <= 0:
+            raise ValueError("The batch size and the latency deadline must be positive.")
+
+        self.detector = detector
+        self.scaler = scaler
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.n_points = 0
+        self.n_anomalies = 0
+        self._closed = False
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._latencies = deque(maxlen=latency_window)
+
+    async def submit(self, value):
+        """
+        Queues a point for scoring, waiting while the queue is full.
+
+        :param value: The value of the point.
+        """
+        await self._queue.put((value, time.perf_counter()))
+
+    def close(self):
+        """
+        Signals that no more points will be submitted; run() returns once the queued points are scored.
+
+        Never blocks: when the queue is full, run() notices the closed flag once it has drained the queue.
+        """
+        self._closed = True
+        try:
+            self._queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+    async def _next_batch(self):
+        """
+        Collects the next micro-batch, closing it on size or on the latency deadline.
+
+        :return: A tuple with the list of (value, arrival time) items and whether the input was closed.
+        """
+        first = await self._queue.get()
+        if first is None:
+            return [], True
+
+        batch = [first]
+        deadline = first[1] + self.max_latency
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                item = self._queue.get_nowait()
+            else:
+                # Wait for more points only until the deadline of the first point in the batch
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _score(self, values):
+        """
+        Scales and scores a batch of values.
+
+        :param values: NumPy array of values.
+        :return: A NumPy array of the positions of the anomalies within the batch.
+        """
+        # A fresh output array keeps concurrent scorers sharing the scaler from overwriting each other
+        values_scaled = self.scaler.transform(values, out=np.empty(len(values)))
+        return self.detector.predict(values_scaled)
+
+    async def run(self, emit):
+        """
+        Scores micro-batches until the scorer is closed, emitting an event for every anomaly.
+
+        :param emit: Coroutine function called with each anomaly event dictionary.
+        """
+        closed = False
+        while not closed:
+            if self._closed and self._queue.empty():
+                break
+            batch, closed = await self._next_batch()
+            if not batch:
+                continue
+
+            values = np.array([value for value, _ in batch])
+            anomalies = await asyncio.to_thread(self._score, values)
+
+            scored_at = time.perf_counter()
+            self._latencies.extend(scored_at - arrived for _, arrived in batch)
+
+            for position in anomalies:
+                await emit({'event': 'anomaly', 'index': self.n_points + int(position),
+                            'value': float(values[position])})
+            self.n_points += len(batch)
+            self.n_anomalies += len(anomalies)
+
+    def latency_report(self):
+        """
+        Summarizes the recent point latencies.
+
+        :return: A dictionary with the number of points and anomalies and the p50/p99 latencies in milliseconds.
+        """
+        if self._latencies:
+            p50, p99 = np.percentile(np.fromiter(self._latencies, dtype=float), [50, 99]) * 1000
+        else:
+            p50 = p99 = 0.0
+        return {'event': 'summary', 'points': self.n_points, 'anomalies': self.n_anomalies,
+                'p50_ms': float(p50), 'p99_ms': float(p99)}
+
+
+async def _score_lines(reader, writer, detector, scaler, options):
+    """
+    Scores newline-separated values read from a stream and writes JSON-line events back.
+
+    :param reader: asyncio.StreamReader with the incoming values.
+    :param writer: Object with write() and an awaitable drain() receiving the events.
+    :param detector: A fitted IsolationForestAnomalyDetector.
+    :param scaler: A fitted StreamingScaler.
+    :param options: Keyword arguments for MicroBatchScorer.
+    :return: The final latency report.
+    """
+    scorer = MicroBatchScorer(detector, scaler, **options)
+
+    async def emit(event):
+        writer.write((json.dumps(event) + '\n').encode())
+        await writer.drain()
+
+    async def read_values():
+        async for line in reader:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                value = float(line)
+            except ValueError as e:
+                log_error(e)
+                continue
+            await scorer.submit(value)
+
+    scoring = asyncio.create_task(scorer.run(emit))
+    reading = asyncio.create_task(read_values())
+    try:
+        await asyncio.wait((reading, scoring), return_when=asyncio.FIRST_COMPLETED)
+        if scoring.done():
+            # Scoring can only stop early on an error; nothing would empty the queue anymore, so stop reading
+            reading.cancel()
+        else:
+            await reading
+            scorer.close()
+        await scoring
+    finally:
+        reading.cancel()
+        scoring.cancel()
+
+    report = scorer.latency_report()
+    await emit(report)
+    logging.info(f"Scored {report['points']} points, p50 latency {report['p50_ms']:.2f} ms, "
+                 f"p99 latency {report['p99_ms']:.2f} ms")
+    return report
+
+
+async def serve(detector, scaler, host='127.0.0.1', port=8765, **options):
+    """
+    Starts a local TCP server scoring the values sent by each client.
+
+    Clients send one value per line and receive one JSON line per detected anomaly, followed by a summary line with
+    the latency report once they close their side of the connection.
+
+    :param detector: A fitted IsolationForestAnomalyDetector.
+    :param scaler: A fitted StreamingScaler.
+    :param host: The interface to listen on (default is 127.0.0.1).
+    :param port: The port to listen on, 0 for any free port (default is 8765).
+    :param options: Keyword arguments for MicroBatchScorer (max_batch_size, max_latency, queue_size).
+    :return: The running asyncio.Server.
+    """
+    async def handle_connection(reader, writer):
+        try:
+            await _score_lines(reader, writer, detector, scaler, options)
+        except Exception as e:
+            log_error(e)
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    return await asyncio.start_server(handle_connection, host, port)
+
+
+async def score_stdin(detector, scaler, **options):
+    """
+    Scores values read from the standard input and writes JSON-line events to the standard output.
+
+    :param detector: A fitted IsolationForestAnomalyDetector.
+    :param scaler: A fitted StreamingScaler.
+    :param options: Keyword arguments for MicroBatchScorer.
+    :return: The final latency report.
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+    class _StdoutWriter:
+        def write(self, data):
+            sys.stdout.write(data.decode())
+
+        async def drain(self):
+            sys.stdout.flush()
+
+    return await _score_lines(reader, _StdoutWriter(), detector, scaler, options)
+
+
+async def send_points(values, host='127.0.0.1', port=8765):
+    """
+    Loopback client: sends values to a running server and collects the events it sends back.
+
+    :param values: Iterable of values to send.
+    :param host: The server host (default is 127.0.0.1).
+    :param port: The server port (default is 8765).
+    :return: The list of event dictionaries received, the last one being the summary.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+
+    async def send():
+        for value in values:
+            writer.write(f'{value}\n'.encode())
+            await writer.drain()
+        writer.write_eof()
+
+    sending = asyncio.create_task(send())
+    events = [json.loads(line) async for line in reader]
+    await sending
+    writer.close()
+    await writer.wait_closed()
+    return events
+
+
+def train_default_model(num_points=5000, n_estimators=100, contamination=0.05):
+    """
+    Fits a scaler and a detector on a generated warm-up stream, for running the server without a saved model.
+
+    :param num_points: The number of warm-up points (default is 5000).
+    :param n_estimators: The number of trees in the forest (default is 100).
+    :param contamination: The proportion of outliers in the data (default is 0.05).
+    :return: A tuple with the fitted IsolationForestAnomalyDetector and StreamingScaler.
+    """
+    data_stream, _ = generate_advanced_data_stream(num_points=num_points)
+    scaler = StreamingScaler()
+    detector = IsolationForestAnomalyDetector(contamination=contamination, n_estimators=n_estimators)
+    detector.fit(scaler.fit_transform(data_stream))
+    return detector, scaler
+
+
+async def _main(args):
+    if args.model and args.scaler:
+        detector = IsolationForestAnomalyDetector.load(args.model)
+        scaler = StreamingScaler.load(args.scaler)
+    else:
+        detector, scaler = train_default_model()
+
+    options = {'max_batch_size': args.batch_size, 'max_latency': args.max_latency / 1000}
+    if args.stdin:
+        report = await score_stdin(detector, scaler, **options)
+        print(json.dumps(report), file=sys.stderr)
+        return
+
+    server = await serve(detector, scaler, args.host, args.port, **options)
+    logging.info(f"Listening on {args.host}:{args.port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score live data points with micro-batching.")
+    parser.add_argument('--host', default='127.0.0.1', help="The interface to listen on.")
+    parser.add_argument('--port', type=int, default=8765, help="The port to listen on.")
+    parser.add_argument('--stdin', action='store_true', help="Read points from stdin instead of a socket.")
+    parser.add_argument('--batch-size', type=int, default=256, help="The maximum micro-batch size.")
+    parser.add_argument('--max-latency', type=float, default=10.0, help="The micro-batch deadline in milliseconds.")
+    parser.add_argument('--model', help="A detector saved with IsolationForestAnomalyDetector.save.")
+    parser.add_argument('--scaler', help="A scaler saved with StreamingScaler.save.")
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(parser.parse_args()))
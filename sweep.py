@@ -0,0 +1,235 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+import itertools
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from anomaly_detector import IsolationForestAnomalyDetector
+from data_generator import generate_advanced_data_stream
+from data_scaler import scale_data
+from drift_detector import debounce_drift_points, detect_simple_drift
+from utils import calculate_metrics_batch
+
+DEFAULT_GRID = {
+    'contamination': (0.02, 0.05, 0.1),
+    'n_estimators': (50, 100, 200),
+    'window_size': (25, 50, 100),
+    'drift_threshold': (0.1, 0.2, 0.4),
+}
+
+# Same stream as main.py
+DEFAULT_STREAM = {'num_points': 1000, 'noise_level': 0.05, 'trend_factor': 0.001, 'seasonality_period': 150,
+                  'anomaly_freq': 0.04, 'anomaly_magnitude': 4}
+
+SORT_KEYS = ('f1', 'precision', 'recall', 'tp', 'fp', 'fn', 'fit_seconds', 'predict_seconds')
+
+
+@lru_cache(maxsize=32)
+def _generated_stream(seed, stream_items):
+    """
+    Generates (once per process) the stream of a seed and its scaled version.
+
+    :param seed: The seed of the stream.
+    :param stream_items: Sorted tuple of the generate_advanced_data_stream keyword arguments.
+    :return: A tuple with the data stream, its scaled version and the true anomaly indices.
+    """
+    data_stream, true_anomalies = generate_advanced_data_stream(random_state=seed, **dict(stream_items))
+    return data_stream, scale_data(data_stream), true_anomalies
+
+
+def _evaluate_seed(seed, n_estimators, grid, stream_items, cooldown, tolerance):
+    """
+    Worker task: evaluates every configuration of the grid with the given forest size on the stream of one seed.
+
+    The pipeline is the one of main.py: drift points are debounced into retraining points, the forest is fitted on
+    the first segment and refitted on every post-drift segment. The contamination only moves the decision threshold
+    (the contamination percentile of the training scores), so every forest is fitted and scored once and reused for
+    all contamination values. Drift settings that yield the same retraining points share their forests too.
+
+    :param seed: The seed of the generated stream.
+    :param n_estimators: The number of trees in the forest.
+    :param grid: Dictionary with the contamination, window_size and drift_threshold values to evaluate.
+    :param stream_items: Sorted tuple of the generate_advanced_data_stream keyword arguments.
+    :param cooldown: The minimum distance between two retraining points.
+    :param tolerance: The tolerance (number of indices) used to match detections with true anomalies.
+    :return: A list with one result dictionary per configuration.
+    """
+    data_stream, data_stream_scaled, true_anomalies = _generated_stream(seed, stream_items)
+    contaminations = np.asarray(grid['contamination'], dtype=float)
+
+    results = []
+    retrain_cache = {}
+    for window_size, drift_threshold in itertools.product(grid['window_size'], grid['drift_threshold']):
+        drift_points = detect_simple_drift(data_stream, window_size=window_size, drift_threshold=drift_threshold)
+        retrain_points = debounce_drift_points(drift_points, cooldown=cooldown, stream_length=len(data_stream))
+
+        key = tuple(retrain_points)
+        if key not in retrain_cache:
+            detector = IsolationForestAnomalyDetector(n_estimators=n_estimators)
+            detector.model.set_params(random_state=seed)
+            edges = np.concatenate(([0], retrain_points, [len(data_stream_scaled)])).astype(int)
+
+            fit_seconds = predict_seconds = 0.0
+            runs = [[] for _ in contaminations]
+            for start, end in zip(edges[:-1], edges[1:]):
+                segment = data_stream_scaled[start:end]
+                started = time.perf_counter()
+                detector.fit(segment)
+                fitted = time.perf_counter()
+                scores = detector.score_samples(segment)
+
+                # The thresholds of all contamination values, as IsolationForest computes its offset_
+                thresholds = np.percentile(scores, 100.0 * contaminations)
+                for run, threshold in zip(runs, thresholds):
+                    run.append(np.nonzero(scores < threshold)[0] + start)
+                predict_seconds += time.perf_counter() - fitted
+                fit_seconds += fitted - started
+
+            metrics = calculate_metrics_batch([np.concatenate(run) for run in runs], true_anomalies, tolerance)
+            retrain_cache[key] = (metrics[:, 0], fit_seconds, predict_seconds)
+
+        metrics, fit_seconds, predict_seconds = retrain_cache[key]
+        for contamination, (tp, fp, fn) in zip(contaminations, metrics):
+            results.append({'contamination': float(contamination), 'n_estimators': n_estimators,
+                            'window_size': window_size, 'drift_threshold': drift_threshold, 'seed': seed,
+                            'retrains': len(retrain_points), 'tp': int(tp), 'fp': int(fp), 'fn': int(fn),
+                            'fit_seconds': fit_seconds, 'predict_seconds': predict_seconds})
+    return results
+
+
+def summarize(runs, sort_by='f1'):
+    """
+    Aggregates the per-seed results of every configuration and ranks the configurations.
+
+    Counts are summed over the seeds, so precision, recall and F1 are pooled over all streams; times are averaged
+    per stream and are those of a standalone run of the configuration (the fit time includes every retrain).
+
+    :param runs: List of per-seed result dictionaries, as returned by the workers.
+    :param sort_by: The column to rank by; times and error counts rank ascending, the rest descending, ties going to
+                    the fastest configuration (default is 'f1').
+    :return: A list of configuration dictionaries, best first.
+    :raises ValueError: If the sort column is unknown.
+    """
+    if sort_by not in SORT_KEYS:
+        raise ValueError(f"Cannot sort by {sort_by}; choose one of {', '.join(SORT_KEYS)}.")
+
+    grouped = {}
+    for run in runs:
+        key = (run['contamination'], run['n_estimators'], run['window_size'], run['drift_threshold'])
+        grouped.setdefault(key, []).append(run)
+
+    table = []
+    for (contamination, n_estimators, window_size, drift_threshold), seed_runs in grouped.items():
+        tp, fp, fn = (sum(run[metric] for run in seed_runs) for metric in ('tp', 'fp', 'fn'))
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        table.append({
+            'contamination': contamination, 'n_estimators': n_estimators, 'window_size': window_size,
+            'drift_threshold': drift_threshold, 'seeds': len(seed_runs),
+            'retrains': float(np.mean([run['retrains'] for run in seed_runs])),
+            'tp': tp, 'fp': fp, 'fn': fn, 'precision': precision, 'recall': recall,
+            'f1': 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+            'fit_seconds': float(np.mean([run['fit_seconds'] for run in seed_runs])),
+            'predict_seconds': float(np.mean([run['predict_seconds'] for run in seed_runs])),
+        })
+
+    # Ties are broken by the total time, so equally accurate configurations rank cheapest first
+    sign = 1 if sort_by in ('fp', 'fn', 'fit_seconds', 'predict_seconds') else -1
+    table.sort(key=lambda row: (sign * row[sort_by], row['fit_seconds'] + row['predict_seconds']))
+    return table
+
+
+def run_sweep(grid=None, seeds=range(10), stream=None, cooldown=100, tolerance=5, executor='process',
+              max_workers=None, sort_by='f1'):
+    """
+    Evaluates a grid of detector and drift parameters over many generated streams in parallel.
+
+    One task is scheduled per (seed, n_estimators) pair on all cores; each task evaluates every contamination,
+    window_size and drift_threshold value for its forest size. Generated streams are cached per seed in every
+    worker, and forests are reused across threshold-only variations.
+
+    :param grid: Dictionary of parameter values, with the keys of DEFAULT_GRID (default is DEFAULT_GRID); missing
+                 keys take their default values.
+    :param seeds: The seeds of the generated streams (default is range(10)).
+    :param stream: Keyword arguments of generate_advanced_data_stream (default is DEFAULT_STREAM).
+    :param cooldown: The minimum distance between two retraining points (default is 100).
+    :param tolerance: The tolerance used to match detections with true anomalies (default is 5).
+    :param executor: 'process' for a process pool or 'thread' for a thread pool (default is 'process').
+    :param max_workers: The number of workers in the pool (default is the number of CPUs).
+    :param sort_by: The column to rank the configurations by (default is 'f1').
+    :return: The ranked list of configuration dictionaries, see summarize.
+    :raises ValueError: If the executor type, a parameter name or a parameter value is invalid.
+    """
+    if executor not in ('process', 'thread'):
+        raise ValueError("The executor must be either 'process' or 'thread'.")
+    unknown = set(grid or ()) - set(DEFAULT_GRID)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {', '.join(sorted(unknown))}.")
+
+    grid = {name: tuple((grid or {}).get(name, values)) for name, values in DEFAULT_GRID.items()}
+    if not all(0 < contamination <= 0.5 for contamination in grid['contamination']):
+        raise ValueError("Contamination must be between 0 and 0.5.")
+    stream_items = tuple(sorted({**DEFAULT_STREAM, **(stream or {})}.items()))
+
+    pool_class = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+    with pool_class(max_workers=max_workers or os.cpu_count()) as pool:
+        futures = [pool.submit(_evaluate_seed, seed, n_estimators, grid, stream_items, cooldown, tolerance)
+                   for seed in seeds for n_estimators in grid['n_estimators']]
+        runs = [run for future in futures for run in future.result()]
+    return summarize(runs, sort_by)
+
+
+def format_table(table, top=None):
+    """
+    Formats ranked sweep results as a plain-text table.
+
+    :param table: The ranked list of configuration dictionaries.
+    :param top: The number of rows to show, or None for all of them (default is None).
+    :return: The table as a string.
+    """
+    header = (f"{'rank':>4} {'contam':>7} {'trees':>5} {'window':>6} {'drift_thr':>9} {'TP':>6} {'FP':>6} "
+              f"{'FN':>6} {'precision':>9} {'recall':>7} {'F1':>6} {'fit_ms':>8} {'predict_ms':>10}")
+    lines = [header, '-' * len(header)]
+    for rank, row in enumerate(table[:top], start=1):
+        lines.append(f"{rank:>4} {row['contamination']:>7.3f} {row['n_estimators']:>5} {row['window_size']:>6} "
+                     f"{row['drift_threshold']:>9.3f} {row['tp']:>6} {row['fp']:>6} {row['fn']:>6} "
+                     f"{row['precision']:>9.3f} {row['recall']:>7.3f} {row['f1']:>6.3f} "
+                     f"{row['fit_seconds'] * 1000:>8.1f} {row['predict_seconds'] * 1000:>10.1f}")
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep detector and drift parameters over generated streams.")
+    parser.add_argument('--contamination', type=float, nargs='+', default=DEFAULT_GRID['contamination'],
+                        help="Contamination values to evaluate.")
+    parser.add_argument('--n-estimators', type=int, nargs='+', default=DEFAULT_GRID['n_estimators'],
+                        help="Numbers of trees to evaluate.")
+    parser.add_argument('--window-size', type=int, nargs='+', default=DEFAULT_GRID['window_size'],
+                        help="Drift detector window sizes to evaluate.")
+    parser.add_argument('--drift-threshold', type=float, nargs='+', default=DEFAULT_GRID['drift_threshold'],
+                        help="Drift detector thresholds to evaluate.")
+    parser.add_argument('--seeds', type=int, default=10, help="Number of generated streams (seeds 0 to N-1).")
+    parser.add_argument('--num-points', type=int, default=DEFAULT_STREAM['num_points'],
+                        help="Number of points per generated stream.")
+    parser.add_argument('--sort-by', default='f1', choices=SORT_KEYS, help="Column to rank the configurations by.")
+    parser.add_argument('--top', type=int, default=20, help="Number of configurations to print.")
+    parser.add_argument('--max-workers', type=int, help="Number of worker processes (default: all cores).")
+    parser.add_argument('--output', default='sweep_results.json', help="Where to write the full ranked table.")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    table = run_sweep(grid={'contamination': args.contamination, 'n_estimators': args.n_estimators,
+                            'window_size': args.window_size, 'drift_threshold': args.drift_threshold},
+                      seeds=range(args.seeds), stream={'num_points': args.num_points},
+                      max_workers=args.max_workers, sort_by=args.sort_by)
+    print(format_table(table, args.top))
+    print(f"Evaluated {len(table)} configurations on {args.seeds} streams in {time.perf_counter() - started:.1f} s",
+          file=sys.stderr)
+
+    with open(args.output, 'w') as output_file:
+        json.dump(table, output_file, indent=2)
@@ -1,10 +1,27 @@
+import asyncio
+import os
+import tempfile
 import unittest
+from unittest import mock
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import numpy as np
-from anomaly_detector import IsolationForestAnomalyDetector
-from data_generator import generate_advanced_data_stream
-from data_scaler import scale_data
-from drift_detector import detect_simple_drift
-from utils import calculate_metrics
+from numpy.lib.stride_tricks import sliding_window_view
+from anomaly_detector import IsolationForestAnomalyDetector, StreamingIsolationForestAnomalyDetector
+from batch_engine import run_batch
+from benchmark import compare_to_baseline, run_benchmarks
+from data_generator import generate_advanced_data_stream, generate_multiple_streams, generate_stream_chunks
+from data_scaler import scale_data, StreamingScaler
+from decomposition import SeasonalDecomposer
+from drift_detector import debounce_drift_points, detect_simple_drift, OnlineDriftDetector
+from features import delta_features, lag_features, rolling_features, window_features
+import instrumentation
+from ingestion import iter_chunks, open_stream, run_file_pipeline
+from model_cache import fingerprint, ModelCache
+from plotter import plot_real_time
+from stream_server import send_points, serve
+from sweep import run_sweep
+from thresholds import StreamingQuantileThreshold
+from utils import calculate_metrics, calculate_metrics_batch
 
 
 class TestAnomalyDetectionProject(unittest.TestCase):
@@ -32,6 +49,29 @@ class TestAnomalyDetectionProject(unittest.TestCase):
         self.assertEqual(len(data_stream), 1000)
         self.assertGreater(len(anomaly_indices), 0)
 
+    def test_reproducible_generators(self):
+        """
+        Tests that seeded generators are reproducible and that chunked and multi-series output keep the anomalies.
+        """
+        first, first_anomalies = generate_advanced_data_stream(num_points=1000, random_state=7)
+        second, second_anomalies = generate_advanced_data_stream(num_points=1000, random_state=7)
+        np.testing.assert_array_equal(first, second)
+        np.testing.assert_array_equal(first_anomalies, second_anomalies)
+
+        chunks = list(generate_stream_chunks(chunk_size=400, num_points=1000, anomaly_freq=0.05, random_state=7))
+        self.assertEqual([len(chunk) for chunk, _ in chunks], [400, 400, 200])
+        self.assertEqual(chunks[0][0].dtype, np.float32)
+        self.assertTrue(np.all((chunks[1][1] >= 400) & (chunks[1][1] < 800)))
+        self.assertEqual(sum(len(anomalies) for _, anomalies in chunks), 50)
+
+        data_streams, anomaly_indices = generate_multiple_streams(8, num_points=1000, anomaly_freq=0.05,
+                                                                  random_state=7)
+        self.assertEqual(data_streams.shape, (8, 1000))
+        self.assertEqual(data_streams.dtype, np.float32)
+        self.assertEqual(anomaly_indices.shape, (8, 50))
+        self.assertEqual(len(np.unique(anomaly_indices[0])), 50)
+        self.assertFalse(np.allclose(data_streams[0], data_streams[1]))
+
     def test_scale_data(self):
         """
         Tests that the scale_data function correctly scales the data.
@@ -41,6 +81,29 @@ class TestAnomalyDetectionProject(unittest.TestCase):
         # Verify if the mean of the scaled data is close to 0
         self.assertAlmostEqual(np.mean(scaled_data), 0, delta=0.1)
 
+    def test_streaming_scaler(self):
+        """
+        Tests that the streaming scaler matches scale_data when fitted chunk by chunk and survives a save/load cycle.
+        """
+        scaler = StreamingScaler()
+        for start in range(0, 1000, 128):
+            scaler.partial_fit(self.data_stream[start:start + 128])
+        np.testing.assert_allclose(scaler.transform(self.data_stream), self.scaled_data_stream)
+
+        out = np.empty(1000, dtype=np.float32)
+        scaled = scaler.transform(self.data_stream, out=out)
+        self.assertTrue(np.shares_memory(scaled, out))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'scaler.npz')
+            scaler.save(path)
+            loaded = StreamingScaler.load(path)
+        self.assertEqual(loaded.n_samples_seen, 1000)
+        np.testing.assert_allclose(loaded.transform(self.data_stream[:10]), self.scaled_data_stream[:10])
+
+        with self.assertRaises(ValueError):
+            StreamingScaler().transform(self.data_stream)
+
     def test_drift_detection(self):
         """
         Tests that detect_simple_drift correctly detects drift in the data.
@@ -49,6 +112,59 @@ class TestAnomalyDetectionProject(unittest.TestCase):
         self.assertIsInstance(drift_points, np.ndarray)
         self.assertGreaterEqual(len(drift_points), 1)  # Expect at least one drift point
 
+    def test_online_drift_detection(self):
+        """
+        Tests that the online drift detector returns the same indices as the batch function, chunk by chunk.
+        """
+        expected = detect_simple_drift(self.data_stream, window_size=10, drift_threshold=0.1)
+
+        online = OnlineDriftDetector(window_size=10, drift_threshold=0.1)
+        chunked = np.concatenate([online.update(self.data_stream[i:i + 37]) for i in range(0, 1000, 37)])
+        np.testing.assert_array_equal(chunked, expected)
+
+        online.reset()
+        single = np.concatenate([online.update(value) for value in self.data_stream[:200]])
+        np.testing.assert_array_equal(single, expected[expected <= 200])
+
+    def test_debounce_drift_points(self):
+        """
+        Tests that bursts of adjacent drift points collapse into a single retraining point.
+        """
+        drift_points = np.array([120, 121, 125, 180, 260, 262, 950])
+        np.testing.assert_array_equal(debounce_drift_points(drift_points, cooldown=100), [120, 260, 950])
+        np.testing.assert_array_equal(debounce_drift_points(drift_points, cooldown=100, stream_length=1000),
+                                      [120, 260])
+        self.assertEqual(len(debounce_drift_points(np.array([]))), 0)
+
+    def test_predict_segments(self):
+        """
+        Tests that segment-wise prediction retrains on each post-drift segment and returns global indices.
+        """
+        detector = IsolationForestAnomalyDetector(contamination=0.05, n_estimators=50)
+        detector.fit(self.scaled_data_stream[:400])
+        anomalies = detector.predict_segments(self.scaled_data_stream, np.array([400, 700]))
+
+        self.assertTrue(np.all(np.diff(anomalies) > 0))
+        self.assertTrue(np.all((anomalies >= 0) & (anomalies < 1000)))
+        # Each segment is scored by a model fitted on it, so it holds about the contamination share of anomalies
+        for start, end in [(0, 400), (400, 700), (700, 1000)]:
+            self.assertGreaterEqual(np.sum((anomalies >= start) & (anomalies < end)), 1)
+
+    def test_predict_segments_keeps_cached_model(self):
+        """
+        Tests that segment-wise retraining does not modify a detector shared through the model cache.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ModelCache(tmp)
+            detector = cache.get_or_fit('a', self.scaled_data_stream[:300], n_estimators=20)
+            offset = detector.model.offset_
+            estimators = list(detector.model.estimators_)
+            detector.predict_segments(self.scaled_data_stream, np.array([300, 600]))
+
+            cached = cache.get_or_fit('a', self.scaled_data_stream[:300], n_estimators=20)
+            self.assertEqual(cached.model.offset_, offset)
+            self.assertEqual(cached.model.estimators_, estimators)
+
     def test_isolation_forest_anomaly_detection(self):
         """
         Tests the Isolation Forest anomaly detector to ensure it correctly detects anomalies.
@@ -72,6 +188,282 @@ class TestAnomalyDetectionProject(unittest.TestCase):
         self.assertGreaterEqual(fp, 0)  # False positives should be >= 0
         self.assertGreaterEqual(fn, 0)  # False negatives should be >= 0
 
+    def test_calculate_metrics_tolerance(self):
+        """
+        Tests that detections are matched to true anomalies within the tolerance, including batched evaluation.
+        """
+        detected = np.array([10, 22, 50])
+        true_anomalies = np.array([12, 40, 51])
+        self.assertEqual(calculate_metrics(detected, true_anomalies, tolerance=2), (2, 1, 1))
+        self.assertEqual(calculate_metrics(np.array([]), true_anomalies), (0, 0, 3))
+
+        results = calculate_metrics_batch([detected, np.array([40])], true_anomalies, tolerances=[0, 2, 20])
+        self.assertEqual(results.shape, (2, 3, 3))
+        np.testing.assert_array_equal(results[0, 1], [2, 1, 1])
+        np.testing.assert_array_equal(results[0, 2], [3, 0, 0])
+        np.testing.assert_array_equal(results[1, 0], [1, 0, 2])
+
+    def test_run_batch(self):
+        """
+        Tests that the batch engine returns one result per series with both process and thread pools.
+        """
+        series_collection = np.stack([self.data_stream, self.data_stream[::-1], self.data_stream * 2])
+        for executor in ('process', 'thread'):
+            results = run_batch(series_collection, executor=executor, max_workers=2, chunk_size=2, n_estimators=20)
+            self.assertEqual(len(results), 3)
+            for result in results:
+                self.assertGreaterEqual(len(result['anomalies']), 1)
+                self.assertIsInstance(result['drift_points'], np.ndarray)
+
+        with self.assertRaises(ValueError):
+            run_batch(series_collection, executor='cluster')
+
+    def test_file_pipeline(self):
+        """
+        Tests that on-disk streams are read as zero-copy chunks and that anomaly indices are written out.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = os.path.join(tmp, 'stream.npy')
+            output_path = os.path.join(tmp, 'anomalies.bin')
+            np.save(input_path, self.data_stream)
+
+            data_stream = open_stream(input_path)
+            chunks = list(iter_chunks(data_stream, chunk_size=300))
+            self.assertEqual([start for start, _ in chunks], [0, 300, 600, 900])
+            self.assertTrue(all(np.shares_memory(chunk, data_stream) for _, chunk in chunks))
+            del data_stream, chunks
+
+            n_points, n_anomalies, n_drift_points = run_file_pipeline(input_path, output_path, chunk_size=250,
+                                                                      n_estimators=20)
+            anomalies = np.fromfile(output_path, dtype=np.int64)
+
+        self.assertEqual(n_points, 1000)
+        self.assertEqual(len(anomalies), n_anomalies)
+        self.assertGreaterEqual(n_anomalies, 1)
+        self.assertTrue(np.all((anomalies >= 0) & (anomalies < 1000)))
+        self.assertEqual(n_drift_points, len(detect_simple_drift(self.data_stream)))
+
+    def test_scores_and_custom_threshold(self):
+        """
+        Tests that raw scores are exposed and that thresholds can be retuned without refitting.
+        """
+        detector = IsolationForestAnomalyDetector(contamination=0.05, n_estimators=50)
+        detector.fit(self.scaled_data_stream)
+        scores = detector.score_samples(self.scaled_data_stream)
+
+        self.assertTrue(np.all((scores >= -1) & (scores <= 0)))
+        np.testing.assert_allclose(detector.decision_function(self.scaled_data_stream),
+                                   scores - detector.model.offset_)
+        np.testing.assert_array_equal(detector.predict(self.scaled_data_stream, threshold=detector.model.offset_),
+                                      detector.predict(self.scaled_data_stream))
+
+        strict = detector.predict(self.scaled_data_stream, threshold=np.quantile(scores, 0.01))
+        self.assertLess(len(strict), len(detector.predict(self.scaled_data_stream)))
+
+    def test_streaming_quantile_threshold(self):
+        """
+        Tests that the quantile sketch is accurate to a bin width and adapts over its sliding window.
+        """
+        rng = np.random.default_rng(0)
+        scores = -rng.uniform(0.3, 0.8, size=5000)
+
+        sketch = StreamingQuantileThreshold(quantile=0.05, n_bins=1000)
+        for start in range(0, 5000, 333):
+            sketch.update(scores[start:start + 333])
+        self.assertEqual(sketch.count, 5000)
+        self.assertAlmostEqual(sketch.threshold, np.quantile(scores, 0.05), delta=sketch.bin_width)
+        threshold = sketch.threshold
+        sketch.update([np.nan, np.inf, -np.inf])
+        self.assertEqual(sketch.count, 5000)
+        self.assertEqual(sketch.threshold, threshold)
+
+        windowed = StreamingQuantileThreshold(quantile=0.05, window_size=1000, n_blocks=4, n_bins=1000)
+        windowed.update(scores)
+        windowed.update(-rng.uniform(0.1, 0.2, size=1000))
+        self.assertEqual(windowed.count, 1000)
+        self.assertGreater(windowed.threshold, -0.2)
+        self.assertEqual(windowed.is_anomaly([-0.9, -0.15]).tolist(), [True, False])
+
+    def test_flat_forest_matches_sklearn(self):
+        """
+        Tests that the array-backed forest returns the same scores and anomalies as the scikit-learn model.
+        """
+        detector = IsolationForestAnomalyDetector(contamination=0.05, n_estimators=50)
+        detector.fit(self.scaled_data_stream)
+        flat = detector.export_flat()
+
+        np.testing.assert_array_equal(flat.score_samples(self.scaled_data_stream),
+                                      detector.model.score_samples(self.scaled_data_stream))
+        np.testing.assert_array_equal(flat.score_samples(self.scaled_data_stream, chunk_size=7),
+                                      detector.model.score_samples(self.scaled_data_stream))
+        np.testing.assert_array_equal(flat.predict(self.scaled_data_stream), detector.predict(self.scaled_data_stream))
+        np.testing.assert_array_equal(flat.predict(self.scaled_data_stream[:5]), detector.predict(self.scaled_data_stream[:5]))
+
+        # A forest fitted on a single sample has no path length to normalize by
+        single = IsolationForestAnomalyDetector(contamination=0.05, n_estimators=10)
+        single.fit(np.array([3.0]))
+        points = np.array([3.0, 5.0])
+        np.testing.assert_array_equal(single.export_flat().score_samples(points),
+                                      single.model.score_samples(points.reshape(-1, 1)))
+        np.testing.assert_array_equal(single.export_flat().predict(points), single.predict(points))
+
+    def test_model_persistence(self):
+        """
+        Tests that a saved detector predicts the same anomalies after loading it.
+        """
+        detector = IsolationForestAnomalyDetector(contamination=0.05, n_estimators=50)
+        detector.fit(self.scaled_data_stream)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'model.joblib')
+            detector.save(path)
+            loaded = IsolationForestAnomalyDetector.load(path)
+
+        np.testing.assert_array_equal(loaded.predict(self.scaled_data_stream), detector.predict(self.scaled_data_stream))
+
+    def test_model_cache(self):
+        """
+        Tests that the model cache reuses trained forests across instances and evicts the least recently used.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ModelCache(tmp, max_entries=2)
+            first = cache.get_or_fit('a', self.scaled_data_stream, n_estimators=20)
+            self.assertIs(cache.get_or_fit('a', self.scaled_data_stream, n_estimators=20), first)
+
+            # A restarted cache loads the stored forest instead of refitting it
+            restarted = ModelCache(tmp, max_entries=2)
+            reloaded = restarted.get_or_fit('a', self.scaled_data_stream, n_estimators=20)
+            np.testing.assert_array_equal(reloaded.predict(self.scaled_data_stream),
+                                          first.predict(self.scaled_data_stream))
+
+            restarted.get_or_fit('b', self.scaled_data_stream, n_estimators=20)
+            restarted.get_or_fit('a', self.scaled_data_stream, n_estimators=20)
+            restarted.get_or_fit('c', self.scaled_data_stream, n_estimators=20)
+            self.assertEqual(len(restarted), 2)
+            self.assertEqual(len(os.listdir(tmp)), 2)
+            data_fingerprint = fingerprint(self.scaled_data_stream, contamination=0.05, n_estimators=20)
+            self.assertIsNone(restarted.get('b', data_fingerprint))
+            self.assertIsNotNone(restarted.get('a', data_fingerprint))
+
+    def test_benchmarks(self):
+        """
+        Tests that the benchmark suite covers every stage and flags regressions against a baseline.
+        """
+        results = run_benchmarks(sizes=[500], n_estimators_values=[10], repeat=1)
+        self.assertEqual({result['stage'] for result in results},
+                         {'generate', 'scale', 'drift', 'fit', 'predict', 'metrics'})
+        self.assertEqual(compare_to_baseline(results, results), [])
+
+        slower = [dict(result, seconds=result['seconds'] * 2 + 1) for result in results]
+        regressions = compare_to_baseline(slower, results, tolerance=0.5)
+        self.assertEqual(len(regressions), sum(result['seconds'] >= 1e-3 for result in results))
+
+    def test_instrumentation(self):
+        """
+        Tests that stage timers and counters are only collected while instrumentation is enabled.
+        """
+        instrumentation.reset()
+        scale_data(self.data_stream)
+        instrumentation.increment('points_processed', 1000)
+        self.assertEqual(instrumentation.snapshot()['stages'], {})
+
+        instrumentation.enable(profile=['tracemalloc'])
+        try:
+            scale_data(self.data_stream)
+            detect_simple_drift(self.data_stream)
+            with instrumentation.stage('custom'):
+                instrumentation.increment('points_processed', 1000)
+            metrics = instrumentation.snapshot()
+        finally:
+            instrumentation.disable()
+            instrumentation.reset()
+
+        self.assertEqual(set(metrics['stages']), {'scale', 'drift', 'custom'})
+        self.assertEqual(metrics['stages']['scale']['calls'], 1)
+        self.assertEqual(metrics['counters'], {'points_processed': 1000})
+        self.assertGreater(metrics['memory']['peak_bytes'], 0)
+
+    def test_plot_real_time_headless(self):
+        """
+        Tests that the headless renderer shows a bounded, decimated window of the stream.
+        """
+        drift_points = detect_simple_drift(self.data_stream)
+        fig = plot_real_time(self.data_stream, self.true_anomalies[:10], drift_points, self.true_anomalies,
+                             batch_size=100, window_width=400, max_points=100, headless=True)
+        ax = fig.axes[0]
+        line = ax.get_lines()[0]
+
+        self.assertLessEqual(len(line.get_xdata()), 100)
+        self.assertEqual(ax.get_xlim(), (600.0, 1000.0))
+        self.assertAlmostEqual(max(line.get_ydata()), self.data_stream[600:].max())
+
+    def test_plot_real_time_without_blitting(self):
+        """
+        Tests that the renderer falls back to full redraws on canvases that do not support blitting.
+        """
+        drift_points = detect_simple_drift(self.data_stream)
+        with mock.patch.object(FigureCanvasAgg, 'supports_blit', False), \
+                mock.patch.object(FigureCanvasAgg, 'copy_from_bbox', side_effect=AssertionError) as copy_from_bbox:
+            fig = plot_real_time(self.data_stream, self.true_anomalies[:10], drift_points, self.true_anomalies,
+                                 batch_size=100, window_width=400, max_points=100, headless=True)
+        line = fig.axes[0].get_lines()[0]
+
+        copy_from_bbox.assert_not_called()
+        self.assertFalse(line.get_animated())
+        self.assertEqual(fig.axes[0].get_xlim(), (600.0, 1000.0))
+
+    def test_stream_server(self):
+        """
+        Tests that the ingestion server scores live points from a loopback client like the batch detector does.
+        """
+        scaler = StreamingScaler()
+        detector = IsolationForestAnomalyDetector(contamination=0.05, n_estimators=50)
+        detector.fit(scaler.fit_transform(self.data_stream))
+        expected = detector.predict(scaler.transform(self.data_stream))
+
+        async def run():
+            server = await serve(detector, scaler, port=0, max_batch_size=64, max_latency=0.005)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                return await send_points(self.data_stream, port=port)
+            finally:
+                server.close()
+                await server.wait_closed()
+
+        events = asyncio.run(run())
+        summary = events[-1]
+        self.assertEqual(summary['event'], 'summary')
+        self.assertEqual(summary['points'], 1000)
+        self.assertLessEqual(summary['p50_ms'], summary['p99_ms'])
+        np.testing.assert_array_equal([event['index'] for event in events[:-1]], expected)
+
+    def test_stream_server_scoring_failure(self):
+        """
+        Tests that a failing detector closes the connection instead of hanging once the queue is full.
+        """
+        class FailingDetector:
+            def predict(self, data_stream):
+                raise RuntimeError("Scoring failed")
+
+        scaler = StreamingScaler().partial_fit(self.data_stream)
+
+        async def run():
+            server = await serve(FailingDetector(), scaler, port=0, queue_size=16, max_latency=0.001)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                return await asyncio.wait_for(send_points(self.data_stream[:200], port=port), timeout=10)
+            finally:
+                server.close()
+                await server.wait_closed()
+
+        with self.assertLogs(level='ERROR') as logs:
+            try:
+                events = asyncio.run(run())
+            except ConnectionError:
+                events = []  # The server may close the socket while the client is still sending
+        self.assertFalse(any(event['event'] == 'summary' for event in events))
+        self.assertTrue(any('Scoring failed' in message for message in logs.output))
+
     def test_invalid_data_handling(self):
         """
         Tests that functions handle invalid data cases properly.
@@ -83,6 +475,221 @@ class TestAnomalyDetectionProject(unittest.TestCase):
         with self.assertRaises(ValueError):
             detector.fit(np.array([]))  # Fitting the model with empty data should raise an error
 
+    def test_streaming_anomaly_detection(self):
+        """
+        Tests that the streaming detector keeps its memory and tree count bounded while scoring new chunks.
+        """
+        detector = StreamingIsolationForestAnomalyDetector(contamination=0.05, n_estimators=50, buffer_size=300,
+                                                           trees_per_update=10, random_state=0)
+        for start in range(0, len(self.data_stream), 100):
+            detector.partial_fit(self.scaled_data_stream[start:start + 100])
+            self.assertEqual(detector.n_trees, 50)
+        self.assertEqual(len(detector.buffer), 300)
+
+        # Whole blocks are evicted, but the forest keeps its size when n_estimators is not a multiple of the update
+        detector = StreamingIsolationForestAnomalyDetector(n_estimators=25, buffer_size=300, trees_per_update=10,
+                                                           random_state=0)
+        for start in range(0, len(self.data_stream), 100):
+            detector.partial_fit(self.scaled_data_stream[start:start + 100])
+            self.assertEqual(detector.n_trees, 25)
+
+        scores = detector.score_chunk(self.scaled_data_stream)
+        self.assertEqual(scores.shape, (1000,))
+        anomalies = detector.predict(self.scaled_data_stream)
+        np.testing.assert_array_equal(anomalies, np.where(scores < 0)[0])
+        self.assertGreaterEqual(len(anomalies), 1)
+
+    def test_streaming_ring_buffer(self):
+        """
+        Tests that the ring buffer keeps exactly the most recent points of the stream.
+        """
+        detector = StreamingIsolationForestAnomalyDetector(buffer_size=5, trees_per_update=5, n_estimators=10)
+        detector.partial_fit(np.arange(3))
+        detector.partial_fit(np.arange(3, 7))
+        self.assertEqual(sorted(detector.buffer), [2, 3, 4, 5, 6])
+        with self.assertRaises(ValueError):
+            detector.partial_fit(np.array([]))
+
+    def test_seasonal_decomposition(self):
+        """
+        Tests that the decomposer removes trend and seasonality, chunk by chunk as in one shot, and that lag features
+        are a zero-copy view.
+        """
+        data_stream, _ = generate_advanced_data_stream(num_points=2000, anomaly_freq=0, drift_frequency=10_000,
+                                                       seasonality_period=100, random_state=0)
+        residuals = SeasonalDecomposer(seasonality_period=100).transform(data_stream)
+        self.assertEqual(residuals.shape, (2000,))
+        self.assertTrue(np.all(residuals[:100] == 0))  # Warm-up period
+        self.assertLess(np.std(residuals[500:]), 0.2 * np.std(data_stream))
+
+        decomposer = SeasonalDecomposer(seasonality_period=100)
+        chunked = np.concatenate([decomposer.transform(data_stream[start:start + 70]) for start in range(0, 2000, 70)])
+        np.testing.assert_allclose(chunked, residuals)
+
+        primed = SeasonalDecomposer(seasonality_period=100).fit_profile(data_stream).transform(data_stream)
+        self.assertLess(np.std(primed[:100]), 0.5 * np.std(data_stream[:100]))  # No warm-up with a primed profile
+
+        features = lag_features(residuals, 2)
+        self.assertEqual(features.shape, (2000, 3))
+        np.testing.assert_array_equal(features[10], residuals[[10, 9, 8]])
+        self.assertTrue(np.shares_memory(features[:, 0], features[:, 1]))
+
+        detector = IsolationForestAnomalyDetector(contamination=0.05, n_estimators=50)
+        detector.fit(features)
+        self.assertEqual(detector.score_samples(features).shape, (2000,))
+
+        with self.assertRaises(ValueError):
+            SeasonalDecomposer(seasonality_period=0)
+
+    def test_window_features(self):
+        """
+        Tests the lag, rolling and delta features on a multivariate stream, and that lags are a zero-copy view.
+        """
+        data = np.arange(12.0).reshape(6, 2)
+        lags = lag_features(data, 2)
+        self.assertEqual(lags.shape, (6, 6))
+        np.testing.assert_array_equal(lags[3], [6, 7, 4, 5, 2, 3])
+        np.testing.assert_array_equal(lags[0], [0, 1, 0, 1, 0, 1])
+        self.assertTrue(np.shares_memory(lags[:, :2], lags[:, 2:]))
+
+        rolling = rolling_features(data, 3, stats=('mean', 'std', 'min', 'max'))
+        np.testing.assert_allclose(rolling[4], [6, 7, np.std([4, 6, 8]), np.std([5, 7, 9]), 4, 5, 8, 9])
+        np.testing.assert_allclose(rolling[1, :2], [1, 2])  # Partial window at the start of the stream
+        np.testing.assert_array_equal(delta_features(data, 2)[:, 0], [0, 0, 4, 4, 4, 4])
+        self.assertEqual(window_features(data, n_lags=1, window_size=3, delta_lag=1).shape, (6, 10))
+
+        with self.assertRaises(ValueError):
+            rolling_features(data, 3, stats=('median',))
+
+        # A large offset over a long stream must not cost the rolling std its precision
+        values = 1e4 + 0.01 * np.random.default_rng(0).standard_normal(200_000)
+        stds = rolling_features(values, 50, stats=('std',))[49:, 0]
+        np.testing.assert_allclose(stds, sliding_window_view(values, 50).std(axis=-1), rtol=1e-6)
+
+    def test_multivariate_pipeline(self):
+        """
+        Tests that scaling, drift detection and both detectors handle several metrics scored together.
+        """
+        data_streams, _ = generate_multiple_streams(3, num_points=1000, random_state=0)
+        samples = data_streams.T.astype(float)
+
+        scaled = scale_data(samples)
+        self.assertEqual(scaled.shape, (1000, 3))
+        np.testing.assert_allclose(scaled.mean(axis=0), 0, atol=1e-9)
+
+        scaler = StreamingScaler()
+        for start in range(0, 1000, 300):
+            scaler.partial_fit(samples[start:start + 300])
+        np.testing.assert_allclose(scaler.transform(samples), scaled, atol=1e-9)
+        with self.assertRaises(ValueError):
+            scaler.partial_fit(samples[:, :2])
+
+        expected = detect_simple_drift(samples, window_size=10, drift_threshold=0.1)
+        np.testing.assert_array_equal(np.unique(np.concatenate(
+            [detect_simple_drift(samples[:, i], window_size=10, drift_threshold=0.1) for i in range(3)])), expected)
+        online = OnlineDriftDetector(window_size=10, drift_threshold=0.1)
+        np.testing.assert_array_equal(np.concatenate([online.update(samples[start:start + 64])
+                                                      for start in range(0, 1000, 64)]), expected)
+
+        features = lag_features(scaled, 2)
+        detector = IsolationForestAnomalyDetector(contamination=0.05, n_estimators=50)
+        detector.fit(features)
+        anomalies = detector.predict(features)
+        self.assertGreaterEqual(len(anomalies), 1)
+        np.testing.assert_array_equal(detector.export_flat().predict(features), anomalies)
+        with self.assertRaises(ValueError):
+            detector.export_flat().predict(features[:, :2])
+        univariate = IsolationForestAnomalyDetector(n_estimators=10)
+        univariate.fit(self.scaled_data_stream)
+        with self.assertRaises(ValueError):
+            univariate.export_flat().predict(features)
+
+        streaming = StreamingIsolationForestAnomalyDetector(n_estimators=20, buffer_size=200, trees_per_update=5,
+                                                            random_state=0)
+        for start in range(0, 1000, 100):
+            streaming.partial_fit(scaled[start:start + 100])
+        self.assertEqual(streaming.buffer.shape, (200, 3))
+        self.assertEqual(streaming.score_chunk(scaled).shape, (1000,))
+        with self.assertRaises(ValueError):
+            streaming.partial_fit(scaled[:, :2])
+
+    def test_multivariate_end_to_end(self):
+        """
+        Tests that batch, file and decomposition paths keep the features of multivariate streams, and that a
+        one-dimensional array is read as a single sample once the number of features is known.
+        """
+        data_streams, _ = generate_multiple_streams(4, num_points=600, random_state=0)
+        samples = data_streams[:2].T.astype(float)
+
+        online = OnlineDriftDetector(window_size=10, drift_threshold=0.1)
+        online.update(samples[:50])
+        online.update(samples[50])
+        self.assertEqual(online.n_seen, 51)
+        with self.assertRaises(ValueError):
+            online.update(samples[:5, :1])
+
+        scaler = StreamingScaler().partial_fit(samples)
+        self.assertEqual(scaler.transform(samples[0]).shape, (1, 2))
+        with self.assertRaises(ValueError):
+            scaler.transform(samples[:, :1])
+
+        residuals = SeasonalDecomposer(seasonality_period=200).transform(samples)
+        self.assertEqual(residuals.shape, (600, 2))
+        np.testing.assert_allclose(residuals[:, 1], SeasonalDecomposer(seasonality_period=200).transform(samples[:, 1]))
+
+        collection = np.stack([samples, data_streams[2:].T.astype(float)])
+        for executor in ('process', 'thread'):
+            results = run_batch(collection, executor=executor, max_workers=2, n_estimators=20)
+            self.assertEqual(len(results), 2)
+            self.assertTrue(all(np.all(result['anomalies'] < 600) for result in results))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            npy_path = os.path.join(tmp, 'stream.npy')
+            np.save(npy_path, samples)
+            self.assertEqual(open_stream(npy_path).shape, (600, 2))
+
+            raw_path = os.path.join(tmp, 'stream.bin')
+            samples.tofile(raw_path)
+            self.assertEqual(open_stream(raw_path, n_features=2).shape, (600, 2))
+            with self.assertRaises(ValueError):
+                open_stream(raw_path, n_features=7)
+
+            n_points, n_anomalies, _ = run_file_pipeline(raw_path, os.path.join(tmp, 'anomalies.bin'),
+                                                         chunk_size=200, n_estimators=20, n_features=2)
+            self.assertEqual(n_points, 600)
+            self.assertGreaterEqual(n_anomalies, 1)
+
+    def test_parameter_sweep(self):
+        """
+        Tests that the sweep ranks every configuration and matches a standalone run of the segmented pipeline.
+        """
+        grid = {'contamination': (0.05, 0.1), 'n_estimators': (20,), 'window_size': (25, 50),
+                'drift_threshold': (0.2,)}
+        table = run_sweep(grid, seeds=(0, 1), stream={'num_points': 600}, executor='thread', max_workers=2)
+        self.assertEqual(len(table), 4)
+        self.assertEqual([row['f1'] for row in table], sorted((row['f1'] for row in table), reverse=True))
+        self.assertTrue(all(row['seeds'] == 2 and row['fit_seconds'] > 0 for row in table))
+
+        # Reference: the same configuration run on its own, with the seeded forest of the sweep
+        expected = np.zeros(3, dtype=int)
+        for seed in (0, 1):
+            data_stream, true_anomalies = generate_advanced_data_stream(
+                num_points=600, noise_level=0.05, trend_factor=0.001, seasonality_period=150, anomaly_freq=0.04,
+                anomaly_magnitude=4, random_state=seed)
+            retrain_points = debounce_drift_points(detect_simple_drift(data_stream, window_size=25), cooldown=100,
+                                                   stream_length=600)
+            data_stream_scaled = scale_data(data_stream)
+            detector = IsolationForestAnomalyDetector(contamination=0.1, n_estimators=20)
+            detector.model.set_params(random_state=seed)
+            detector.fit(data_stream_scaled[:retrain_points[0] if len(retrain_points) else 600])
+            expected += calculate_metrics(detector.predict_segments(data_stream_scaled, retrain_points),
+                                          true_anomalies)
+        row = next(row for row in table if row['contamination'] == 0.1 and row['window_size'] == 25)
+        self.assertEqual((row['tp'], row['fp'], row['fn']), tuple(expected))
+
+        with self.assertRaises(ValueError):
+            run_sweep({'max_samples': (64,)})
+
 
 if __name__ == '__main__':
     unittest.main()
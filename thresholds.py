@@ -0,0 +1,115 @@
+import numpy as np
+
+
+class StreamingQuantileThreshold:
+    """
+    A bounded-memory streaming quantile sketch used to set anomaly thresholds on detector scores.
+
+    Scores are counted in a fixed-bin histogram over a known value range (Isolation Forest scores lie in [-1, 0]),
+    so updates are vectorized and the quantile error is bounded by one bin width. With a ``window_size``, the
+    histogram is split into ``n_blocks`` blocks that are recycled oldest first, so the threshold follows the last
+    ``window_size`` scores (in steps of one block) without storing them.
+    """
+
+    def __init__(self, quantile=0.05, window_size=None, n_blocks=8, n_bins=2048, value_range=(-1.0, 0.0)):
+        """
+        Initializes the StreamingQuantileThreshold.
+
+        :param quantile: The quantile of the scores used as threshold, e.g. the contamination (default is 0.05).
+        :param window_size: The number of recent scores the threshold adapts to, or None for all scores
+                            (default is None).
+        :param n_blocks: The number of blocks the sliding window is divided into (default is 8).
+        :param n_bins: The number of histogram bins (default is 2048).
+        :param value_range: The (low, high) range of the scores; values outside are clipped (default is (-1, 0)).
+        :raises ValueError: If the quantile, window or bins are outside their valid ranges.
+        """
+        if not 0 < quantile < 1:
+            raise ValueError("The quantile must be between 0 and 1.")
+        if window_size is not None and window_size < n_blocks:
+            raise ValueError("The window size must be at least the number of blocks.")
+        if n_bins < 1 or value_range[0] >= value_range[1]:
+            raise ValueError("The histogram needs at least one bin and a non-empty value range.")
+
+        self.quantile = quantile
+        self.low, self.high = value_range
+        self.n_bins = n_bins
+        self.bin_width = (self.high - self.low) / n_bins
+        self.block_size = None if window_size is None else window_size // n_blocks
+
+        self._blocks = np.zeros((1 if window_size is None else n_blocks, n_bins), dtype=np.int64)
+        self._total = np.zeros(n_bins, dtype=np.int64)
+        self._current = 0
+        self._current_count = 0
+
+    @property
+    def count(self):
+        """
+        The number of scores currently represented in the sketch.
+        """
+        return int(self._total.sum())
+
+    def _add(self, values):
+        """
+        Counts finite scores in the histogram bins of the current block.
+
+        :param values: One-dimensional NumPy array of finite scores.
+        """
+        bins = np.clip(((values - self.low) / self.bin_width).astype(np.int64), 0, self.n_bins - 1)
+        counts = np.bincount(bins, minlength=self.n_bins)
+        self._blocks[self._current] += counts
+        self._total += counts
+        self._current_count += len(values)
+
+    def update(self, scores):
+        """
+        Adds a batch of scores to the sketch, evicting the oldest block whenever the current one is full.
+
+        NaN and infinite scores carry no rank information and are skipped.
+
+        :param scores: Array-like object of scores.
+        :return: The sketch itself.
+        """
+        scores = np.asarray(scores, dtype=float).ravel()
+        scores = scores[np.isfinite(scores)]
+        if self.block_size is None:
+            self._add(scores)
+            return self
+
+        start = 0
+        while start < len(scores):
+            if self._current_count == self.block_size:
+                # Recycle the oldest block for the new scores
+                self._current = (self._current + 1) % len(self._blocks)
+                self._total -= self._blocks[self._current]
+                self._blocks[self._current] = 0
+                self._current_count = 0
+            end = start + self.block_size - self._current_count
+            self._add(scores[start:end])
+            start = end
+        return self
+
+    @property
+    def threshold(self):
+        """
+        The current estimate of the quantile, interpolated linearly within its histogram bin.
+
+        :raises ValueError: If no score has been added yet.
+        """
+        cumulative = np.cumsum(self._total)
+        if cumulative[-1] == 0:
+            raise ValueError("The sketch is empty.")
+
+        target = self.quantile * cumulative[-1]
+        index = int(np.searchsorted(cumulative, target))
+        below = cumulative[index - 1] if index > 0 else 0
+        fraction = (target - below) / self._total[index]
+        return self.low + (index + fraction) * self.bin_width
+
+    def is_anomaly(self, scores):
+        """
+        Flags the scores below the current threshold.
+
+        :param scores: Array-like object of scores.
+        :return: A boolean NumPy array, True for anomalies.
+        """
+        return np.asarray(scores) < self.threshold